@@ -0,0 +1,102 @@
+"""Compare LocMemCache with the shared SQLite cache across processes.
+
+Every worker process replays the same read-through workload: it looks a
+key up, and on a miss "renders" the value and stores it. Keys follow a
+Zipf-like distribution, like pages of a feed. LocMemCache gives every
+worker its own cold cache, the SQLite cache is shared by all of them.
+
+    python benchmarks/cache_backends.py --workers 4 --requests 5000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from yatube.sqlite_cache import SQLiteCache  # noqa: E402
+
+PAGE = 'x' * 20 * 1024
+
+
+def make_cache(backend, location):
+    options = {'OPTIONS': {'MAX_ENTRIES': 100000}}
+    if backend == 'locmem':
+        return LocMemCache('benchmark', options)
+    return SQLiteCache(location, options)
+
+
+def worker(backend, location, args, seed, results):
+    cache = make_cache(backend, location)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(args.keys)]
+    keys = rng.choices(range(args.keys), weights, k=args.requests)
+    hits, latencies = 0, []
+    for key in keys:
+        started = time.perf_counter()
+        value = cache.get(f'page:{key}')
+        if value is None:
+            time.sleep(args.render_ms / 1000)
+            cache.set(f'page:{key}', PAGE, timeout=300)
+        else:
+            hits += 1
+        latencies.append(time.perf_counter() - started)
+    results.put((hits, latencies))
+
+
+def run(backend, args):
+    location = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(backend, location, args, seed, results))
+        for seed in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    hits = sum(hits for hits, _ in collected)
+    latencies = sorted(
+        latency for _, latencies in collected for latency in latencies)
+    total = len(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f'{backend:>8}: hit rate {hits / total:6.1%}, '
+          f'p50 {quantiles[49] * 1000:7.3f} ms, '
+          f'p99 {quantiles[98] * 1000:7.3f} ms, '
+          f'{total / elapsed:8.0f} req/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=5000,
+                        help='requests per worker')
+    parser.add_argument('--keys', type=int, default=2000)
+    parser.add_argument('--render-ms', type=float, default=5,
+                        help='time spent rendering a page on a miss')
+    args = parser.parse_args()
+    print(f'{args.workers} workers x {args.requests} requests '
+          f'over {args.keys} keys, {args.render_ms} ms per miss')
+    for backend in ('locmem', 'sqlite'):
+        run(backend, args)
+
+
+if __name__ == '__main__':
+    main()
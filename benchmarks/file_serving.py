@@ -0,0 +1,138 @@
+"""Worker CPU time spent per image by each way of serving media files.
+
+Every request is answered by the view and its body written to a socket
+the way a WSGI server would: chunk by chunk from Python for a plain
+iterator, with ``os.sendfile`` when the response exposes the file as
+``wsgi.file_wrapper`` servers expect. A child process drains the socket,
+so only the worker's own user and system time is counted.
+
+    python benchmarks/file_serving.py --size 500000 --requests 500
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(SENDFILE_MODE='', ALLOWED_HOSTS=['*'])
+django.setup()
+
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.views import static  # noqa: E402
+
+from yatube import files  # noqa: E402
+
+PATH = 'posts/image.jpg'
+
+
+def drain(sock, other_end):
+    other_end.close()
+    while sock.recv(1 << 20):
+        pass
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def send(response, sock, sendfile):
+    """Write the response body like a WSGI server, with or w/o sendfile."""
+    stream = getattr(response, 'file_to_stream', None)
+    if sendfile and stream is not None:
+        offset = stream.tell()
+        remaining = int(response['Content-Length'])
+        while remaining:
+            sent = os.sendfile(sock.fileno(), stream.fileno(), offset,
+                               remaining)
+            offset += sent
+            remaining -= sent
+    elif response.streaming:
+        for chunk in response.streaming_content:
+            sock.sendall(chunk)
+    else:
+        sock.sendall(response.content)
+    response.close()
+
+
+def run(view, requests, sock, sendfile, **headers):
+    request = RequestFactory().get('/media/' + PATH, **headers)
+    started = cpu_time()
+    for _ in range(requests):
+        send(view(request), sock, sendfile)
+    return cpu_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=500 * 1000,
+                        help='image size in bytes')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.mkdir(os.path.join(root, 'posts'))
+        with open(os.path.join(root, PATH), 'wb') as image:
+            image.write(os.urandom(args.size))
+        worker, reader = socket.socketpair()
+        drainer = multiprocessing.Process(target=drain,
+                                          args=(reader, worker))
+        drainer.start()
+        reader.close()
+
+        def new_serve(request, path, document_root):
+            return files.serve(request, path, document_root,
+                               accel_prefix='/internal/media/')
+
+        etag = new_serve(RequestFactory().get('/'), PATH, root)['ETag']
+        # The first mode is the baseline: static.serve behind a server
+        # without wsgi.file_wrapper, reading the file through Python.
+        modes = [
+            ('static.serve, read in Python', static.serve, '', False, {}),
+            ('static.serve + sendfile', static.serve, '', True, {}),
+            ('files.serve + sendfile', new_serve, '', True, {}),
+            ('files.serve, revalidated (304)', new_serve, '', True,
+             {'HTTP_IF_NONE_MATCH': etag}),
+            ('files.serve + X-Accel-Redirect', new_serve, 'nginx', True, {}),
+        ]
+        results = []
+        for name, view, mode, sendfile, headers in modes:
+            with override_settings(SENDFILE_MODE=mode):
+                view = _bind(view, root)
+                started = time.perf_counter()
+                cpu = run(view, args.requests, worker, sendfile, **headers)
+                wall = time.perf_counter() - started
+            results.append((name, cpu, wall))
+        worker.shutdown(socket.SHUT_WR)
+        worker.close()
+        drainer.join()
+
+    baseline = results[0][1] / args.requests
+    print(f'{args.requests} requests of a {args.size} byte image')
+    print(f'{"mode":34} {"cpu ms/req":>10} {"wall ms/req":>11} '
+          f'{"worker s saved per 1000":>24}')
+    for name, cpu, wall in results:
+        per_request = cpu / args.requests
+        print(f'{name:34} {per_request * 1000:10.3f} '
+              f'{wall / args.requests * 1000:11.3f} '
+              f'{(baseline - per_request) * 1000:24.3f}')
+
+
+def _bind(view, root):
+    def bound(request):
+        return view(request, PATH, document_root=root)
+    return bound
+
+
+if __name__ == '__main__':
+    main()
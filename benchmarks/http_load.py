@@ -0,0 +1,372 @@
+"""Load every page of the site over HTTP and compare with the last run.
+
+A seeded dataset is generated with ``manage.py generate_data`` into a
+temporary database, cache and media directory, and the site is served
+from it by ``manage.py serve``. ``--concurrency`` client processes then
+send requests back to back for ``--duration`` seconds, each to a route
+picked by its weight in ``ROUTES``; a share of the requests to public
+pages carry the session of a logged-in user. The statistics of the
+first ``--warmup`` seconds, while the caches fill, are dropped.
+
+Throughput and the p50/p95/p99 latency of every route are printed next
+to their change since the results stored in ``--baseline``, which are
+then replaced with the new ones. Runs are only comparable on the same
+machine with the same options.
+
+    python benchmarks/http_load.py --concurrency 16 --duration 60
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+DIRECTORY = tempfile.mkdtemp()
+os.environ.update({
+    'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+    'DJANGO_DEBUG': '0',
+    'DJANGO_DATABASE_NAME': os.path.join(DIRECTORY, 'db.sqlite3'),
+    'DJANGO_CACHE_LOCATION': os.path.join(DIRECTORY, 'cache.sqlite3'),
+    'DJANGO_MEDIA_ROOT': os.path.join(DIRECTORY, 'media'),
+})
+os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', '*')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.storage import staticfiles_storage  # noqa
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.models import Max, Min  # noqa: E402
+from django.middleware.csrf import get_token  # noqa: E402
+from django.test import Client, RequestFactory  # noqa: E402
+from django.urls import URLResolver, reverse  # noqa: E402
+
+from posts.management.commands.generate_data import (  # noqa: E402
+    PLACEHOLDER_IMAGES, WORDS)
+from posts.models import Group, Post, User  # noqa: E402
+
+BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baselines',
+                        'http_load.json')
+STYLESHEET = 'bootstrap/dist/css/bootstrap.min.css'
+SAMPLE_POSTS = 1000
+
+# ``auth`` is 'user' for pages that need a login, 'anonymous' for pages
+# meant for guests and 'any' for the rest. Statuses below 400 and those
+# in ``expected`` count as answers, the rest as errors.
+Route = namedtuple('Route', 'name weight auth method url expected',
+                   defaults=[()])
+
+
+def _page(rng):
+    return rng.choice([1, 1, 1, 1, 2, 2, 3, 5])
+
+
+def _post(rng, data, session):
+    if session and session['posts'] and rng.random() < 0.5:
+        return session['posts']
+    return data['posts']
+
+
+ROUTES = [
+    Route('index', 20, 'any', 'GET', lambda rng, data, session:
+          f'{reverse("index")}?page={_page(rng)}'),
+    Route('post', 20, 'any', 'GET', lambda rng, data, session:
+          reverse('post', args=rng.choice(data['posts']))),
+    Route('profile', 12, 'any', 'GET', lambda rng, data, session:
+          reverse('profile', args=[rng.choice(data['posts'])[0]])),
+    Route('group_posts', 10, 'any', 'GET', lambda rng, data, session:
+          reverse('group_posts', args=[rng.choice(data['groups'])])),
+    Route('follow_index', 10, 'user', 'GET', lambda rng, data, session:
+          f'{reverse("follow_index")}?page={_page(rng)}'),
+    Route('search', 5, 'any', 'GET', lambda rng, data, session:
+          f'{reverse("search")}?{urlencode({"q": rng.choice(WORDS)})}'),
+    Route('group_list', 3, 'any', 'GET', lambda rng, data, session:
+          reverse('group_list')),
+    Route('add_comment', 3, 'user', 'POST', lambda rng, data, session:
+          reverse('add_comment', args=rng.choice(data['posts']))),
+    Route('media', 3, 'any', 'GET', lambda rng, data, session:
+          rng.choice(data['media'])),
+    Route('static', 3, 'any', 'GET', lambda rng, data, session:
+          data['static']),
+    Route('about:author', 2, 'any', 'GET', lambda rng, data, session:
+          reverse('about:author')),
+    Route('about:tech', 2, 'any', 'GET', lambda rng, data, session:
+          reverse('about:tech')),
+    Route('profile_follow', 1, 'user', 'GET', lambda rng, data, session:
+          reverse('profile_follow',
+                  args=[rng.choice(session['follows'])])),
+    # Users share sessions, so the author may already be unfollowed.
+    Route('profile_unfollow', 1, 'user', 'GET', lambda rng, data, session:
+          reverse('profile_unfollow',
+                  args=[rng.choice(session['follows'])]),
+          expected=[404]),
+    Route('new_post', 1, 'user', 'GET', lambda rng, data, session:
+          reverse('new_post')),
+    Route('post_edit', 1, 'user', 'GET', lambda rng, data, session:
+          reverse('post_edit', args=rng.choice(_post(rng, data, session)))),
+    Route('signup', 1, 'anonymous', 'GET', lambda rng, data, session:
+          reverse('signup')),
+    Route('login', 1, 'anonymous', 'GET', lambda rng, data, session:
+          reverse('login')),
+    Route('admin:index', 1, 'anonymous', 'GET', lambda rng, data, session:
+          reverse('admin:index')),
+]
+# Routes that would end the session or need a mailed token.
+SKIPPED = {
+    'logout', 'password_change', 'password_change_done', 'password_reset',
+    'password_reset_done', 'password_reset_confirm',
+    'password_reset_complete',
+}
+
+
+def route_names():
+    """Return the names of the routes of ``yatube/urls.py``."""
+    from yatube import urls
+    names = set()
+    for entry in urls.urlpatterns:
+        if not isinstance(entry, URLResolver):
+            if entry.name:
+                names.add(entry.name)
+        elif entry.namespace == 'admin':
+            names.add('admin:index')
+        else:
+            prefix = f'{entry.namespace}:' if entry.namespace else ''
+            names.update(f'{prefix}{pattern.name}'
+                         for pattern in entry.url_patterns if pattern.name)
+    return names
+
+
+def seed(args):
+    call_command('migrate', verbosity=0)
+    call_command('generate_data', seed=args.seed, users=args.users,
+                 posts=args.posts, comments=args.comments,
+                 stdout=open(os.devnull, 'w'))
+    if not os.path.exists(os.path.join(settings.STATIC_ROOT,
+                                       staticfiles_storage.manifest_name)):
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    rng = random.Random(args.seed)
+    span = Post.objects.aggregate(first=Min('id'), last=Max('id'))
+    ids = rng.sample(range(span['first'], span['last'] + 1),
+                     min(SAMPLE_POSTS, span['last'] - span['first'] + 1))
+    data = {
+        'groups': list(Group.objects.values_list('slug', flat=True)),
+        'posts': list(Post.objects.filter(id__in=ids).values_list(
+            'author__username', 'id')),
+        'media': [f'{settings.MEDIA_URL}posts/generated-{number}.jpg'
+                  for number in range(PLACEHOLDER_IMAGES)],
+        'static': staticfiles_storage.url(STYLESHEET),
+        'sessions': [],
+    }
+    users = User.objects.order_by('id')
+    for user in rng.sample(list(users), min(args.sessions, users.count())):
+        client = Client()
+        client.force_login(user)
+        request = RequestFactory().get('/')
+        token = get_token(request)
+        data['sessions'].append({
+            'cookie': f'{settings.SESSION_COOKIE_NAME}='
+                      f'{client.cookies[settings.SESSION_COOKIE_NAME].value}'
+                      f'; {settings.CSRF_COOKIE_NAME}='
+                      f'{request.META["CSRF_COOKIE"]}',
+            'csrf': token,
+            'posts': list(Post.objects.filter(author=user).values_list(
+                'author__username', 'id')[:20]),
+            # Followed and unfollowed in turn.
+            'follows': [username for username, _ in
+                        rng.sample(data['posts'], 5)],
+        })
+    connections.close_all()
+    return data
+
+
+def request(address, method, path, session):
+    headers = {}
+    body = None
+    if session:
+        headers['Cookie'] = session['cookie']
+    if method == 'POST':
+        headers['X-CSRFToken'] = session['csrf']
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        body = urlencode({'text': 'Нагрузочный комментарий.'})
+    connection = http.client.HTTPConnection(*address, timeout=30)
+    try:
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def client(address, args, data, number, measure_from, until, results):
+    rng = random.Random(f'{args.seed}-{number}')
+    weights = [route.weight for route in ROUTES]
+    samples = []
+    while time.monotonic() < until:
+        route = rng.choices(ROUTES, weights)[0]
+        session = None
+        if route.auth == 'user' or (route.auth == 'any'
+                                    and rng.random() < args.logged_in):
+            session = rng.choice(data['sessions'])
+        path = route.url(rng, data, session)
+        started = time.monotonic()
+        try:
+            status = request(address, route.method, path, session)
+        except OSError:
+            status = 599
+        if started >= measure_from:
+            # Redirects, e.g. after a comment, are answers like any other.
+            samples.append((route.name, time.monotonic() - started,
+                            status < 400 or status in route.expected))
+    results.put(samples)
+
+
+def serve(args):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, 'manage.py'), 'serve',
+         '127.0.0.1:0', '--workers', str(args.workers)],
+        stdout=subprocess.PIPE, text=True)
+    host, port = re.search(r'http://(.+):(\d+)/',
+                           server.stdout.readline()).groups()
+    return server, (host, int(port))
+
+
+def _percentile(ordered, share):
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def summarize(samples, elapsed):
+    by_route = {}
+    for name, latency, ok in samples:
+        by_route.setdefault(name, []).append((latency, ok))
+    by_route['total'] = [(latency, ok) for _, latency, ok in samples]
+    results = {}
+    for name, answers in by_route.items():
+        latencies = sorted(latency for latency, ok in answers if ok)
+        results[name] = {
+            'requests': len(answers),
+            'errors': len(answers) - len(latencies),
+            'rps': len(answers) / elapsed,
+        }
+        if latencies:
+            results[name].update(
+                {f'p{share}': _percentile(latencies, share / 100) * 1000
+                 for share in (50, 95, 99)})
+    return results
+
+
+def _change(new, old):
+    if not old or new is None:
+        return ''
+    return f'{(new - old) / old:+.0%}'
+
+
+def report(results, options, previous):
+    old = {}
+    if previous:
+        print(f'Compared with the run of {previous["date"]}')
+        if previous['options'] != options:
+            print('Warning: that run had other options, '
+                  f'{previous["options"]}')
+        old = previous['routes']
+    print(f'{"route":>17} {"requests":>8} {"errors":>6} {"req/s":>14} '
+          f'{"p50 ms":>8} {"p95 ms":>14} {"p99 ms":>8}')
+    for name, stats in sorted(results.items(),
+                              key=lambda item: -item[1]['requests']):
+        before = old.get(name, {})
+        rps = _change(stats['rps'], before.get('rps'))
+        p95 = _change(stats.get('p95'), before.get('p95'))
+        print(f'{name:>17} {stats["requests"]:8} {stats["errors"]:6} '
+              f'{stats["rps"]:8.1f} {rps:>5} {stats.get("p50", 0):8.1f} '
+              f'{stats.get("p95", 0):8.1f} {p95:>5} '
+              f'{stats.get("p99", 0):8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='client processes sending requests')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='server worker processes')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--logged-in', type=float, default=0.3,
+                        help='share of public page requests with a login')
+    parser.add_argument('--sessions', type=int, default=100,
+                        help='logged-in users sending requests')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=40000)
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='results of the previous run, replaced')
+    parser.add_argument('--no-save', action='store_true',
+                        help='compare without replacing the baseline')
+    args = parser.parse_args()
+    missing = route_names() - {route.name for route in ROUTES} - SKIPPED
+    if missing:
+        parser.error(f'No traffic defined for {", ".join(sorted(missing))}.')
+
+    print(f'Generating {args.users} users, {args.posts} posts and '
+          f'{args.comments} comments in {DIRECTORY}')
+    data = seed(args)
+    server, address = serve(args)
+    print(f'{args.workers} workers, {args.concurrency} clients, '
+          f'{args.logged_in:.0%} logged in, {args.warmup:g} s warmup, '
+          f'{args.duration:g} s measured')
+    results = multiprocessing.Queue()
+    measure_from = time.monotonic() + args.warmup
+    until = measure_from + args.duration
+    clients = [
+        multiprocessing.Process(
+            target=client,
+            args=(address, args, data, number, measure_from, until, results))
+        for number in range(args.concurrency)
+    ]
+    try:
+        for process in clients:
+            process.start()
+        samples = [sample for _ in clients for sample in results.get()]
+        for process in clients:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+    results = summarize(samples, args.duration)
+    options = {name: value for name, value in vars(args).items()
+               if name not in ('baseline', 'no_save')}
+    previous = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            previous = json.load(file)
+    report(results, options, previous)
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump({'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'options': options, 'routes': results},
+                      file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
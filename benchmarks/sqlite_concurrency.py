@@ -0,0 +1,155 @@
+"""Reproduce "database is locked" under concurrent workers, before/after.
+
+Every worker process replays a request mix against its own alias: most
+requests read a page of the feed, the rest run a small write transaction
+that reads first and then writes, like ``get_or_create`` or a counter
+update. ``stock`` is the plain sqlite3 backend with its defaults and a
+new connection per request; ``tuned`` is ``DATABASES['default']`` from
+``yatube/settings.py`` (WAL, pragmas, persistent connections) with
+writes begun IMMEDIATE, as ``yatube.write_queue`` does.
+
+    python benchmarks/sqlite_concurrency.py --workers 8 --requests 2000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark')
+os.environ.setdefault('DJANGO_DEBUG', '0')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', '*')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from yatube import settings as project  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.configure(DATABASES={
+    'default': {},
+    'stock': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(DIRECTORY, 'stock.sqlite3'),
+    },
+    'tuned': {
+        **project.DATABASES['default'],
+        'NAME': os.path.join(DIRECTORY, 'tuned.sqlite3'),
+    },
+})
+django.setup()
+
+from django.db import OperationalError, connections, transaction  # noqa
+
+SCHEMA = [
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER, '
+    'pub_date REAL, text TEXT)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    'CREATE TABLE stats (author INTEGER PRIMARY KEY, posts INTEGER)',
+]
+AUTHORS = 100
+
+
+def create(alias, rows):
+    with connections[alias].cursor() as cursor:
+        for sql in SCHEMA:
+            cursor.execute(sql)
+        cursor.executemany(
+            'INSERT INTO post (author, pub_date, text) VALUES (%s, %s, %s)',
+            [(row % AUTHORS, row, 'x' * 200) for row in range(rows)])
+        cursor.executemany('INSERT INTO stats VALUES (%s, 0)',
+                           [(author,) for author in range(AUTHORS)])
+    connections[alias].close()
+
+
+def read(cursor):
+    cursor.execute('SELECT id, text FROM post ORDER BY pub_date DESC '
+                   'LIMIT 10')
+    cursor.fetchall()
+
+
+def write(cursor, author):
+    cursor.execute('SELECT posts FROM stats WHERE author = %s', [author])
+    cursor.fetchone()
+    cursor.execute(
+        'INSERT INTO post (author, pub_date, text) VALUES (%s, %s, %s)',
+        [author, time.time(), 'x' * 200])
+    cursor.execute('UPDATE stats SET posts = posts + 1 WHERE author = %s',
+                   [author])
+
+
+def worker(alias, args, seed, results):
+    connection = connections[alias]
+    rng = random.Random(seed)
+    errors, latencies = 0, []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        try:
+            if rng.random() < args.writes:
+                immediate = getattr(connection, 'immediate', nullcontext)
+                with immediate(), transaction.atomic(using=alias):
+                    write(connection.cursor(), rng.randrange(AUTHORS))
+            else:
+                read(connection.cursor())
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        # What Django does at the end of every request.
+        connection.close_if_unusable_or_obsolete()
+    connection.close()
+    results.put((errors, latencies))
+
+
+def run(alias, args):
+    create(alias, args.rows)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker,
+                                args=(alias, args, seed, results))
+        for seed in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    errors = sum(errors for errors, _ in collected)
+    latencies = sorted(
+        latency for _, latencies in collected for latency in latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f'{alias:>6}: {errors:6} locked '
+          f'({errors / len(latencies):6.2%}), '
+          f'p50 {quantiles[49] * 1000:8.3f} ms, '
+          f'p99 {quantiles[98] * 1000:8.3f} ms, '
+          f'{len(latencies) / elapsed:8.0f} req/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='requests per worker')
+    parser.add_argument('--writes', type=float, default=0.2,
+                        help='share of requests that write')
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='posts in the table before the run')
+    args = parser.parse_args()
+    print(f'{args.workers} workers x {args.requests} requests, '
+          f'{args.writes:.0%} writes, {args.rows} rows')
+    for alias in ('stock', 'tuned'):
+        run(alias, args)
+
+
+if __name__ == '__main__':
+    main()
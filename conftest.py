@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cold_cache():
+    """Run the pytest suite on an empty cache, see yatube/testing.py."""
+    from yatube.testing import cold_cache
+
+    with cold_cache():
+        yield
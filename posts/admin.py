@@ -1,16 +1,53 @@
 from django.contrib import admin
 
+from posts import search
 from posts.models import Group, Post, Comment, Follow
+from posts.paginator import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ("text", "pub_date", "author")
+class ScalableAdmin(admin.ModelAdmin):
+    """Changelists without exact COUNT(*) over the whole table."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+
+
+class PostAdmin(ScalableAdmin):
+    list_display = ("text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
-    empty_value_display = "-пусто-"
+    date_hierarchy = "pub_date"
+    autocomplete_fields = ("author", "group")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.enabled():
+            return super().get_search_results(
+                request, queryset, search_term)
+        return search.filter_posts(queryset, search_term), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ("title", "slug")
+    search_fields = ("title", "slug")
+    prepopulated_fields = {"slug": ("title",)}
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ("text", "created", "author", "post")
+    list_select_related = ("author", "post")
+    date_hierarchy = "created"
+    autocomplete_fields = ("author",)
+    raw_id_fields = ("post",)
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
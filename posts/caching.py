@@ -0,0 +1,158 @@
+import time
+from functools import partial, wraps
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (get_cache_key, learn_cache_key,
+                                patch_vary_headers)
+
+from posts.models import Group
+
+# Pages are invalidated by version bumps. Past the soft timeout a page is
+# rebuilt by one request while the others are still served the old copy,
+# past the hard timeout it is gone.
+SOFT_TIMEOUT = 60
+HARD_TIMEOUT = 60 * 60
+# A rebuild that crashed gives its lock up after LOCK_TIMEOUT seconds,
+# requests waiting for a rebuild render the page themselves after LOCK_WAIT.
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 3
+LOCK_POLL = 0.05
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(*scopes):
+    """Return the current version token of every scope."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def version_digest(versions):
+    """Fold version tokens into one short cache key component."""
+    return md5(':'.join(versions).encode()).hexdigest()
+
+
+def post_scopes(post, *group_ids):
+    """Return the scopes of every page showing the post."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    slugs = Group.objects.filter(id__in=group_ids).values_list(
+        'slug', flat=True) if group_ids else []
+    return [
+        'global', f'post:{post.id}', f'author:{post.author_id}',
+        *(f'group:{slug}' for slug in slugs),
+    ]
+
+
+def _set_versions(scopes):
+    cache.set_many(
+        {_version_key(scope): uuid4().hex for scope in scopes}, None)
+
+
+def bump(*scopes):
+    """Invalidate every page cached under one of the scopes."""
+    scopes = set(scopes)
+    _set_versions(scopes)
+    if transaction.get_connection().in_atomic_block:
+        # A page rebuilt before the commit would cache the old rows under
+        # the new version, so bump once more when the rows are visible.
+        transaction.on_commit(lambda: _set_versions(scopes))
+
+
+def _cacheable(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and 'private' not in response.get('Cache-Control', '')
+        and not response.cookies
+    )
+
+
+def _render(view, request, args, kwargs, key_prefix, soft_timeout,
+            hard_timeout):
+    response = view(request, *args, **kwargs)
+    if _cacheable(request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and session.accessed:
+            # SessionMiddleware only adds this once the view has returned.
+            patch_vary_headers(response, ('Cookie',))
+        key = learn_cache_key(request, response, hard_timeout, key_prefix,
+                              cache=cache)
+        cache.set(key, (time.time() + soft_timeout, response), hard_timeout)
+    return response
+
+
+def cached_page(view, request, args, kwargs, key_prefix,
+                soft_timeout=SOFT_TIMEOUT, hard_timeout=HARD_TIMEOUT):
+    """Serve the view from the cache with stale-while-revalidate.
+
+    A fresh entry is returned as is. Past ``soft_timeout`` one request
+    rebuilds the entry while concurrent ones still get the stale copy;
+    on a miss the others wait for that rebuild instead of repeating it.
+    ``hard_timeout`` is how long an entry may be served at all.
+    """
+    if request.method != 'GET':
+        return view(request, *args, **kwargs)
+    render = partial(_render, view, request, args, kwargs, key_prefix,
+                     soft_timeout, hard_timeout)
+    key = get_cache_key(request, key_prefix, 'GET', cache=cache)
+    entry = cache.get(key) if key else None
+    url = md5(request.build_absolute_uri().encode()).hexdigest()
+    lock = f'lock:{key or f"{key_prefix}:{url}"}'
+    # Only the holder knows the token, so a rebuild slower than
+    # LOCK_TIMEOUT does not release the lock another request took since.
+    token = uuid4().hex
+    if entry is not None:
+        fresh_until, response = entry
+        if time.time() < fresh_until or not cache.add(
+                lock, token, LOCK_TIMEOUT):
+            return response
+    else:
+        deadline = time.monotonic() + LOCK_WAIT
+        # Polled with reads, an add is a write and only tried when the
+        # lock looks free.
+        while cache.get(lock) is not None or not cache.add(
+                lock, token, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                return render()
+            time.sleep(LOCK_POLL)
+            key = get_cache_key(request, key_prefix, 'GET', cache=cache)
+            entry = cache.get(key) if key else None
+            if entry is not None:
+                return entry[1]
+    try:
+        return render()
+    finally:
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+
+def cache_page_versioned(*scopes, key_prefix, soft_timeout=SOFT_TIMEOUT,
+                         hard_timeout=HARD_TIMEOUT):
+    """Cache the view with ``cached_page``, keyed on scope versions.
+
+    Scopes are format strings filled in with the view kwargs and the
+    request user, e.g. ``'group:{slug}'`` or ``'follower:{user.pk}'``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            versions = get_versions(*(
+                scope.format(user=request.user, **kwargs)
+                for scope in scopes
+            ))
+            return cached_page(view, request, args, kwargs,
+                               f'{key_prefix}:{version_digest(versions)}',
+                               soft_timeout, hard_timeout)
+        return wrapper
+    return decorator
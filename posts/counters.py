@@ -0,0 +1,60 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def bump(user_id, **deltas):
+    """Atomically add ``deltas`` to the user's counters.
+
+    Users without a stats row are skipped, ``rebuild`` recreates them. A
+    counter that has drifted to 0 stays there instead of going negative.
+    """
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: Greatest(F(name) + delta, 0)
+           for name, delta in deltas.items()})
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(id=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0))
+
+
+def _count(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def _expected():
+    yield Post.objects.all(), 'comments_count', _count(Comment, 'post')
+    for name, (model, field) in USER_COUNTERS.items():
+        yield UserStats.objects.all(), name, _count(model, field)
+
+
+def drift():
+    """Return ``{counter: rows out of sync}`` for every stored counter."""
+    return {
+        name: queryset.annotate(actual=expected).exclude(
+            **{name: F('actual')}).count()
+        for queryset, name, expected in _expected()
+    }
+
+
+def rebuild():
+    """Recount every stored counter from the source tables."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'id', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in missing],
+        ignore_conflicts=True,
+    )
+    for queryset, name, expected in _expected():
+        queryset.update(**{name: expected})
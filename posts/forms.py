@@ -1,4 +1,6 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from posts.images import ingest
 from posts.models import Post, Comment
 
 
@@ -7,6 +9,12 @@ class PostForm(ModelForm):
         model = Post
         fields = ['group', 'text', 'image']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return ingest(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
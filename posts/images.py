@@ -0,0 +1,109 @@
+"""Ingest of uploaded post images within bounded memory.
+
+Uploads above ``FILE_UPLOAD_MAX_MEMORY_SIZE`` are streamed to a temporary
+file in chunks by Django, and ``UploadSizeLimitHandler`` stops reading
+the request as soon as a file passes ``IMAGE_MAX_UPLOAD_SIZE``.
+``ingest`` then reads only the image header to check the size in pixels,
+and originals larger than ``IMAGE_MAX_SIDE`` are downscaled. JPEG is
+decoded at a reduced scale with ``draft``, so its full-size bitmap is
+never held. Other formats have no reduced decode in Pillow: they are
+decoded at full size and then shrunk with ``reduce``. Either way, an
+image whose decode would take more than ``IMAGE_MAX_DECODE_MEMORY``
+bytes is rejected before decoding. Downscaled copies are turned upright
+by their EXIF orientation, since the EXIF itself is not kept, and keep
+their ICC colour profile.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Formats kept on downscale, anything else is stored as PNG.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+ORIENTATION = 0x0112
+# EXIF orientations that turn the image by a quarter.
+TRANSPOSED = (5, 6, 7, 8)
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """Abort the request once an uploaded file passes
+    ``IMAGE_MAX_UPLOAD_SIZE``, the rest of the body is never read.
+
+    Like ``DATA_UPLOAD_MAX_MEMORY_SIZE`` for the other fields, the request
+    is answered with 400. It goes first in ``FILE_UPLOAD_HANDLERS``.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise RequestDataTooBig(
+                'An uploaded file exceeded IMAGE_MAX_UPLOAD_SIZE.')
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def _decode_size(image):
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+def ingest(upload):
+    """Validate an uploaded image and return it, downscaled if needed."""
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            params={'limit': filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)},
+            code='file_too_large')
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Изображение больше %(limit)s пикселей.',
+                params={'limit': settings.IMAGE_MAX_PIXELS},
+                code='too_many_pixels')
+        side = settings.IMAGE_MAX_SIDE
+        if max(width, height) <= side:
+            upload.seek(0)
+            return upload
+        if width >= height:
+            stored = (side, max(height * side // width, 1))
+        else:
+            stored = (max(width * side // height, 1), side)
+        image_format = image.format
+        icc_profile = image.info.get('icc_profile')
+        image.draft(image.mode, stored)
+        if _decode_size(image) > settings.IMAGE_MAX_DECODE_MEMORY:
+            raise ValidationError(
+                'Изображение слишком велико для обработки.',
+                code='too_large_to_decode')
+        target = stored
+        if image.getexif().get(ORIENTATION) in TRANSPOSED:
+            target = stored[::-1]
+        # Decodes the drafted image, already near the target size.
+        image = ImageOps.exif_transpose(image)
+        factor = min(image.size[0] // target[0], image.size[1] // target[1])
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.resize(target, Image.LANCZOS)
+    if image_format not in SAVE_OPTIONS:
+        image_format = 'PNG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, icc_profile=icc_profile,
+               **SAVE_OPTIONS[image_format])
+    name, extension = os.path.splitext(upload.name)
+    if image_format == 'PNG' and extension.lower() != '.png':
+        extension = '.png'
+    return ContentFile(buffer.getvalue(), name=name + extension)
@@ -0,0 +1,247 @@
+"""Generate a large, reproducible dataset for load and scale testing.
+
+Users, groups, follows, posts and comments are streamed into the
+database with ``bulk_create`` in batches, so memory stays bounded by the
+number of users whatever the number of posts. The same ``--seed``,
+sizes and ``--now`` give the same rows. Activity is skewed the way
+social graphs are: the user of rank ``r`` gets followers with a weight
+of ``1 / r ** --skew``, so a few authors have most of the followers and
+pass ``TIMELINE_FANOUT_LIMIT``. How much a user writes follows the same
+law over an independent ranking.
+
+``bulk_create`` sends no signals, so timelines, counters and the search
+index are rebuilt from the tables at the end, and the cache is cleared.
+
+    python manage.py generate_data --users 100000 --posts 2000000
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from posts import counters, search, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+PASSWORD = 'password'
+# Dates are generated relative to a fixed time, not the clock, so a seed
+# gives the same rows on every run.
+EPOCH = '2026-01-01T00:00:00+00:00'
+PLACEHOLDER_IMAGES = 8
+WORDS = (
+    'город', 'дорога', 'утро', 'вечер', 'книга', 'музыка', 'кофе', 'море',
+    'горы', 'лес', 'поезд', 'работа', 'отпуск', 'друзья', 'погода', 'дождь',
+    'солнце', 'зима', 'лето', 'фотография', 'история', 'проект', 'python',
+    'django', 'код', 'идея', 'новости', 'кино', 'сериал', 'рецепт', 'ужин',
+    'прогулка', 'парк', 'кошка', 'собака', 'спорт', 'бег', 'велосипед',
+    'путешествие', 'концерт', 'выставка', 'мысль', 'вопрос', 'ответ',
+    'сегодня', 'завтра', 'вчера', 'очень', 'хорошо', 'плохо', 'интересно',
+    'новый', 'старый', 'большой', 'маленький', 'первый', 'последний',
+)
+
+
+def _batches(objects, size):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def _explicit_dates(*fields):
+    """Let ``bulk_create`` keep the dates set on auto_now_add fields."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a seeded synthetic dataset of posts and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Average authors followed per user.')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of author popularity.')
+        parser.add_argument('--images', type=float, default=0.2,
+                            help='Share of posts with an image.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Posts are spread over this many days.')
+        parser.add_argument('--now', default=EPOCH,
+                            help='Latest date generated, ISO 8601.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.validate(options)
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.now = self.parse_now(options['now'])
+        self.users = self.first_id(User), options['users']
+        self.groups = self.first_id(Group), options['groups']
+        self.posts = self.first_id(Post), options['posts']
+        self.comments = self.first_id(Comment), options['comments']
+        weights = [1 / rank ** options['skew']
+                   for rank in range(1, options['users'] + 1)]
+        self.cum_weights = list(accumulate(weights))
+        self.followers = [0] * options['users']
+        self.activity = list(range(options['users']))
+        self.rng.shuffle(self.activity)
+        images = self.write_images()
+
+        self.insert(User, self.make_users())
+        self.insert(Group, self.make_groups())
+        self.insert(Follow, self.make_follows())
+        with _explicit_dates(Post._meta.get_field('pub_date'),
+                             Comment._meta.get_field('created')):
+            self.insert(Post, self.make_posts(images))
+            self.insert(Comment, self.make_comments())
+
+        self.stdout.write('Rebuilding timelines, counters and search index')
+        timeline.rebuild()
+        counters.rebuild()
+        search.rebuild()
+        # Existing authors, groups and posts got rows too, every cached
+        # page may be out of date.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Dataset generated.'))
+
+    def validate(self, options):
+        for name in ('users', 'groups', 'posts', 'comments', 'follows',
+                     'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} must not be negative.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        if not options['users'] and (options['posts']
+                                     or options['comments']):
+            raise CommandError('Posts and comments need --users > 0.')
+
+    def parse_now(self, value):
+        try:
+            now = parse_datetime(value)
+        except ValueError:
+            now = None
+        if now is None:
+            raise CommandError(f'--now {value!r} is not an ISO 8601 date.')
+        if timezone.is_naive(now):
+            now = timezone.make_aware(now)
+        return now
+
+    def first_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def insert(self, model, objects):
+        total = 0
+        for batch in _batches(objects, self.options['batch_size']):
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(f'{model.__name__}: {total} rows')
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def ranked_users(self, k):
+        """Pick ``k`` user indexes, popular (low) ranks more often."""
+        return self.rng.choices(range(self.options['users']),
+                                cum_weights=self.cum_weights, k=k)
+
+    def post_date(self, index):
+        # Ids grow with the publication date, as when posts are written.
+        span = timedelta(days=self.options['days'])
+        return self.now - span + span * (index + 1) / self.posts[1]
+
+    def write_images(self):
+        names = []
+        for number in range(PLACEHOLDER_IMAGES):
+            name = f'posts/generated-{number}.jpg'
+            if not default_storage.exists(name):
+                # A generator of its own keeps the dataset independent of
+                # which images already exist.
+                colors = random.Random(number)
+                color = tuple(colors.randrange(256) for _ in range(3))
+                buffer = BytesIO()
+                Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+                name = default_storage.save(name,
+                                            ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def make_users(self):
+        password = make_password(PASSWORD)
+        first_id, count = self.users
+        for index in range(count):
+            user_id = first_id + index
+            yield User(id=user_id, username=f'user{user_id}',
+                       password=password, date_joined=self.now)
+
+    def make_groups(self):
+        first_id, count = self.groups
+        for index in range(count):
+            group_id = first_id + index
+            yield Group(id=group_id, title=f'Сообщество {group_id}',
+                        slug=f'group-{group_id}',
+                        description=self.text(5, 20))
+
+    def make_follows(self):
+        first_user, users = self.users
+        mean = self.options['follows']
+        for user in range(users):
+            wanted = min(int(self.rng.expovariate(1 / mean)) if mean else 0,
+                         users - 1)
+            authors = set(self.ranked_users(wanted)) - {user}
+            for author in sorted(authors):
+                self.followers[author] += 1
+                yield Follow(user_id=first_user + user,
+                             author_id=first_user + author)
+
+    def make_posts(self, images):
+        first_user, _ = self.users
+        first_group, groups = self.groups
+        first_id, count = self.posts
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        for index in range(count):
+            author = self.activity[self.ranked_users(1)[0]]
+            group = (first_group + self.rng.randrange(groups)
+                     if groups and self.rng.random() < 0.7 else None)
+            image = (self.rng.choice(images)
+                     if self.rng.random() < self.options['images'] else '')
+            yield Post(id=first_id + index, author_id=first_user + author,
+                       group_id=group, text=self.text(5, 60), image=image,
+                       pub_date=self.post_date(index),
+                       fanned_out=self.followers[author] <= limit)
+
+    def make_comments(self):
+        first_user, users = self.users
+        first_post, posts = self.posts
+        first_id, count = self.comments
+        for index in range(count if posts else 0):
+            post = self.rng.randrange(posts)
+            created = self.post_date(post) + timedelta(
+                minutes=self.rng.randrange(1, 60 * 24))
+            yield Comment(id=first_id + index, post_id=first_post + post,
+                          author_id=first_user + self.rng.randrange(users),
+                          text=self.text(3, 25),
+                          created=min(created, self.now))
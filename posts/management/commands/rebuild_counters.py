@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+from yatube import write_queue
+
+
+class Command(BaseCommand):
+    help = 'Check stored post and user counters for drift and rebuild them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift, fail if any counter is out of sync.',
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.drift()
+        for name, rows in drift.items():
+            self.stdout.write(f'{name}: {rows} rows out of sync')
+        if options['check']:
+            if any(drift.values()):
+                raise CommandError('Counters have drifted.')
+            return
+        with write_queue.write_transaction():
+            counters.rebuild()
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from yatube import write_queue
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts and comments.'
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError('Search index needs the SQLite backend.')
+        with write_queue.write_transaction():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,226 @@
+"""Pre-forking WSGI server for production.
+
+The master loads ``yatube.wsgi`` once, binds the socket and forks the
+workers, so the code, templates and static manifest are shared
+copy-on-write. Each worker answers requests from the shared socket one at
+a time, dropping clients silent for ``--timeout`` seconds, and exits
+after ``--max-requests`` (plus jitter, so they don't all restart
+together) or once its resident memory passes ``--max-memory``; the
+master replaces it. Workers dying right after their boot are respawned
+after a doubling delay, and the master gives up after
+``MAX_QUICK_DEATHS`` of them in a row. SIGTERM or SIGINT stop
+accepting, let the workers finish their current request and kill the
+stragglers after ``--graceful-timeout``.
+
+    python manage.py serve 0.0.0.0:8000 --workers 4
+"""
+import os
+import random
+import resource
+import signal
+import socket
+import time
+import traceback
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# Seconds a worker waits for a connection before checking its state.
+POLL = 0.5
+# A worker failing within QUICK_DEATH seconds of its boot is respawned
+# after RESPAWN_DELAY, doubled on every such death in a row up to
+# MAX_RESPAWN_DELAY.
+QUICK_DEATH = 5
+RESPAWN_DELAY = 0.1
+MAX_RESPAWN_DELAY = 10
+MAX_QUICK_DEATHS = 10
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def handle(self):
+        try:
+            super().handle()
+        except socket.timeout:
+            # A client that goes quiet mid-request is dropped.
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkerServer(WSGIServer):
+    handled = 0
+    # Seconds a connection may stay silent before the worker drops it.
+    client_timeout = None
+
+    def process_request(self, request, client_address):
+        self.handled += 1
+        super().process_request(request, client_address)
+
+    def get_request(self):
+        request, address = super().get_request()
+        # Connections inherit the listener's POLL timeout; an idle
+        # client must not hold the worker forever either.
+        request.settimeout(self.client_timeout)
+        return request, address
+
+
+def _rss_mb():
+    """Return the current resident memory, the peak without /proc."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return pages * resource.getpagesize() / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = 'Serve the site with a pool of pre-forked worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('addrport', nargs='?', default='0.0.0.0:8000')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument(
+            '--max-requests', type=int, default=1000,
+            help='Restart a worker after this many requests, 0 never.')
+        parser.add_argument('--max-requests-jitter', type=int, default=100)
+        parser.add_argument(
+            '--max-memory', type=int, default=512,
+            help='Restart a worker above this many MB of current RSS, '
+                 '0 never.')
+        parser.add_argument('--graceful-timeout', type=float, default=30)
+        parser.add_argument(
+            '--timeout', type=float, default=5,
+            help='Drop a client silent for this many seconds.')
+
+    def handle(self, *args, **options):
+        host, _, port = options['addrport'].rpartition(':')
+        if not port.isdigit():
+            raise CommandError(f'"{options["addrport"]}" is not host:port.')
+        from yatube.wsgi import application
+        # Workers must not share the master's database connections.
+        connections.close_all()
+
+        listener = socket.create_server((host or '0.0.0.0', int(port)),
+                                        backlog=1024)
+        # Workers losing the race for a connection give up on accept()
+        # after POLL. A non-blocking socket would make the select() of
+        # handle_request() return at once and the workers spin.
+        listener.settimeout(POLL)
+        host, port = listener.getsockname()[:2]
+        self.stdout.write(f'Listening at http://{host}:{port}/ with '
+                          f'{options["workers"]} workers')
+        self.stdout.flush()
+        self.options = options
+        # Boot time of every worker, by pid.
+        self.workers = {}
+        self.quick_deaths = 0
+        self.respawn_at = 0
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            while not self.stopping:
+                while (len(self.workers) < options['workers']
+                       and time.monotonic() >= self.respawn_at):
+                    self.spawn(listener, application)
+                if not self.reap():
+                    time.sleep(POLL)
+        finally:
+            listener.close()
+            self.shutdown()
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def spawn(self, listener, application):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            self.stdout.write(f'Booted worker {pid}')
+            self.stdout.flush()
+            return
+        status = 0
+        try:
+            self.work(listener, application)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+
+    def reap(self, block=False):
+        """Collect one exited worker, return whether there was one."""
+        try:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return False
+        if pid:
+            booted = self.workers.pop(pid, None)
+            if os.WIFSIGNALED(status):
+                reason = f'signal {os.WTERMSIG(status)}'
+            else:
+                reason = f'status {os.WEXITSTATUS(status)}'
+            self.stdout.write(f'Worker {pid} exited with {reason}')
+            self.stdout.flush()
+            if not self.stopping:
+                self.throttle(status, booted)
+        return bool(pid)
+
+    def throttle(self, status, booted):
+        """Delay the respawn of workers that fail right after booting."""
+        failed = not os.WIFEXITED(status) or os.WEXITSTATUS(status)
+        if not failed or booted is None or (
+                time.monotonic() - booted > QUICK_DEATH):
+            self.quick_deaths = 0
+            return
+        self.quick_deaths += 1
+        if self.quick_deaths >= MAX_QUICK_DEATHS:
+            raise CommandError(
+                f'{self.quick_deaths} workers in a row failed to boot.')
+        self.respawn_at = time.monotonic() + min(
+            RESPAWN_DELAY * 2 ** (self.quick_deaths - 1), MAX_RESPAWN_DELAY)
+
+    def shutdown(self):
+        self.stopping = True
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.options['graceful_timeout']
+        while self.workers and time.monotonic() < deadline:
+            if not self.reap():
+                time.sleep(0.05)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+            self.reap(block=True)
+
+    def work(self, listener, application):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        random.seed()
+        max_requests = self.options['max_requests']
+        if max_requests:
+            max_requests += random.randint(
+                0, self.options['max_requests_jitter'])
+        max_memory = self.options['max_memory']
+
+        server = WorkerServer(listener.getsockname(), QuietHandler,
+                              bind_and_activate=False)
+        server.socket.close()
+        server.socket = listener
+        server.server_name = socket.getfqdn(listener.getsockname()[0])
+        server.server_port = listener.getsockname()[1]
+        server.setup_environ()
+        server.set_app(application)
+        server.timeout = POLL
+        server.client_timeout = self.options['timeout']
+        while not stopping:
+            server.handle_request()
+            if max_requests and server.handled >= max_requests:
+                break
+            if max_memory and _rss_mb() > max_memory:
+                break
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in (
+        f'CREATE VIRTUAL TABLE posts_post_search USING fts5('
+        f'text, {TOKENIZE})',
+        f'CREATE VIRTUAL TABLE posts_comment_search USING fts5('
+        f'text, post_id UNINDEXED, {TOKENIZE})',
+        'INSERT INTO posts_post_search (rowid, text) '
+        'SELECT id, text FROM posts_post',
+        'INSERT INTO posts_comment_search (rowid, text, post_id) '
+        'SELECT id, text, post_id FROM posts_comment',
+    ):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE posts_post_search')
+    schema_editor.execute('DROP TABLE posts_comment_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_auto_20261018_0158'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
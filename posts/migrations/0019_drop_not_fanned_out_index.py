@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_not_fanned_out_idx',
+        ),
+    ]
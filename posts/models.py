@@ -14,9 +14,42 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Columns rendered by includes/post_item.html and post.html.
+    FEED_FIELDS = (
+        'text', 'pub_date', 'image', 'comments_count', 'group__title',
+        'group__slug', 'author__username', 'author__first_name',
+        'author__last_name',
+    )
+    STATS_FIELDS = (
+        'author__stats__posts_count', 'author__stats__followers_count',
+        'author__stats__following_count',
+    )
+
+    def feed(self, with_stats=False):
+        """Join author and group and load only what post cards render.
+
+        Comment counts come from the stored ``comments_count`` column,
+        so a page of cards is a single query whatever the comments are.
+        """
+        if with_stats:
+            return self.select_related('author__stats', 'group').only(
+                *self.FEED_FIELDS, *self.STATS_FIELDS)
+        return self.select_related('author', 'group').only(
+            *self.FEED_FIELDS)
+
+
 class Post(models.Model):
     class Meta:
         ordering = ['-pub_date']
+        # Feeds are read newest first by (pub_date, id), see
+        # posts.paginator.
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_feed_idx'),
+        ]
 
     text = models.TextField(verbose_name='Содержание записи',
                             help_text='Вложите в этот пост всю '
@@ -35,14 +68,37 @@ class Post(models.Model):
                               verbose_name='Изображение',
                               help_text='Можете прикрепить '
                               'сюда свою фотографию.')
+    # Posts of very popular authors are not pushed into the followers'
+    # timelines, the follow feed reads them straight from this table.
+    fanned_out = models.BooleanField(default=False, editable=False,
+                                     verbose_name='Разослан подписчикам')
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Комментариев')
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        # The counter is only changed by F() updates in posts.counters,
+        # saving a possibly stale instance must not write it back. A save
+        # that finds no row still inserts every field.
+        if update_fields is None:
+            values = [value for value in values
+                      if value[0].name != 'comments_count']
+        return super()._do_update(base_qs, using, pk_val, values,
+                                  update_fields, forced_update)
+
 
 class Comment(models.Model):
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
 
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name='comments')
@@ -64,8 +120,51 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'], name='unique_follow')
         ]
+        # The unique constraint covers lookups by user, this one the
+        # followers of an author.
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE,
                              related_name='follower')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='following')
+
+
+class Timeline(models.Model):
+    """Materialized follow feed: one row per post per follower."""
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_feed_idx'),
+        ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField()
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters, kept in sync by posts.signals."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Записей')
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок')
+
+    def __str__(self):
+        return str(self.user_id)
@@ -0,0 +1,236 @@
+import base64
+import json
+from heapq import merge
+from math import ceil
+from operator import attrgetter
+
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Max, Min, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+PER_PAGE = 10
+# ``?page=N`` is still served with OFFSET up to this page number,
+# everything deeper has to be reached with a cursor.
+MAX_OFFSET_PAGES = 10
+# Rows counted at most when estimating the total, keeps COUNT bounded.
+COUNT_LIMIT = PER_PAGE * MAX_OFFSET_PAGES + 1
+# Page links shown on each side of the current page.
+LINKS_AROUND = 2
+DEFAULT_KEYS = ('pub_date', 'id')
+# Ids must fit the signed 64-bit integers of the database.
+MAX_ID = 2 ** 63 - 1
+# Admin changelists count exactly up to this many rows.
+EXACT_COUNT_LIMIT = 10000
+
+
+def encode_cursor(post, number, direction):
+    """Pack the (pub_date, id) key of a post into an opaque token."""
+    payload = json.dumps(
+        [post.pub_date.isoformat(), post.id, number, direction],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a token made by ``encode_cursor``, return None if invalid."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        pub_date, post_id, number, direction = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode())
+        pub_date = parse_datetime(pub_date)
+        if pub_date is not None and timezone.is_aware(pub_date):
+            # Dates near the ends of the calendar do not survive the
+            # conversion the query does.
+            pub_date = pub_date.astimezone(timezone.utc)
+        post_id, number = int(post_id), int(number)
+    except (TypeError, ValueError, UnicodeDecodeError, OverflowError):
+        return None
+    if (pub_date is None or number < 1 or direction not in ('n', 'p')
+            or not -MAX_ID - 1 <= post_id <= MAX_ID):
+        return None
+    return pub_date, post_id, number, direction
+
+
+class KeysetPaginator:
+    """Paginate posts by (pub_date, id) instead of COUNT + OFFSET.
+
+    Shallow ``?page=N`` links are served with a plain OFFSET, deeper pages
+    are reached through ``?cursor=`` tokens that seek past the last seen
+    key. The returned page and paginator are regular Django ``Page`` and
+    ``Paginator`` objects, so templates keep working, but the paginator's
+    count is never computed with an unbounded COUNT(*).
+
+    ``queryset`` may also be a list of ``(queryset, keys)`` sources whose
+    rows are disjoint; each one is read with its own keyset query on the
+    ``keys`` fields (which must hold the post's pub_date and id) and the
+    results are merged.
+    """
+
+    def __init__(self, queryset, per_page=PER_PAGE,
+                 max_offset_pages=MAX_OFFSET_PAGES, count_limit=COUNT_LIMIT):
+        if isinstance(queryset, QuerySet):
+            queryset = [(queryset, DEFAULT_KEYS)]
+        self.sources = [
+            (source.order_by(f'-{date_key}', f'-{id_key}'),
+             (date_key, id_key))
+            for source, (date_key, id_key) in queryset
+        ]
+        self.queryset = self.sources[0][0]
+        self.per_page = per_page
+        self.max_offset_pages = max_offset_pages
+        self.count_limit = count_limit
+
+    def estimate_count(self):
+        """Count rows, but never more than ``count_limit`` of them."""
+        # Without the ordering the bounded subquery needs no sort.
+        if not self.count_limit:
+            return 0
+        return min(
+            sum(source.order_by()[:self.count_limit].count()
+                for source, _ in self.sources),
+            self.count_limit,
+        )
+
+    def get_page(self, request):
+        """Return a ``(paginator, page)`` pair for the request."""
+        cursor = decode_cursor(request.GET.get('cursor', ''))
+        if cursor is not None:
+            pub_date, post_id, number, direction = cursor
+            if direction == 'n':
+                rows, has_next = self._after(pub_date, post_id)
+            else:
+                rows, has_next = self._before(pub_date, post_id), True
+        else:
+            number = self._page_number(request.GET.get('page'))
+            rows, has_next = self._at(number)
+            if not rows and number > 1:
+                return self._last_shallow_page()
+        return self._build(rows, number, has_next)
+
+    def _page_number(self, value):
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return 1
+        return min(max(number, 1), self.max_offset_pages)
+
+    def _last_shallow_page(self):
+        count = self.estimate_count()
+        number = min(max(ceil(count / self.per_page), 1),
+                     self.max_offset_pages)
+        rows, has_next = self._at(number)
+        return self._build(rows, number, has_next)
+
+    def _merge(self, querysets, reverse=True):
+        if len(querysets) == 1:
+            return list(querysets[0])
+        return list(merge(*querysets, key=attrgetter('pub_date', 'id'),
+                          reverse=reverse))
+
+    def _at(self, number):
+        offset = (number - 1) * self.per_page
+        stop = offset + self.per_page + 1
+        if len(self.sources) == 1:
+            rows = list(self.queryset[offset:stop])
+        else:
+            rows = self._merge(
+                [source[:stop] for source, _ in self.sources])[offset:stop]
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _after(self, pub_date, post_id):
+        rows = self._merge([
+            source.filter(
+                Q(**{f'{date_key}__lt': pub_date}) |
+                Q(**{date_key: pub_date, f'{id_key}__lt': post_id})
+            )[:self.per_page + 1]
+            for source, (date_key, id_key) in self.sources
+        ])[:self.per_page + 1]
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _before(self, pub_date, post_id):
+        rows = self._merge([
+            source.filter(
+                Q(**{f'{date_key}__gt': pub_date}) |
+                Q(**{date_key: pub_date, f'{id_key}__gt': post_id})
+            ).order_by(date_key, id_key)[:self.per_page]
+            for source, (date_key, id_key) in self.sources
+        ], reverse=False)[:self.per_page]
+        rows.reverse()
+        return rows
+
+    def _build(self, rows, number, has_next):
+        seen = (number - 1) * self.per_page + len(rows)
+        if has_next:
+            count = max(self.estimate_count(), seen + 1)
+        else:
+            count = seen
+        paginator = Paginator(self.queryset, self.per_page)
+        # Prime the cached property so Page methods never hit COUNT(*).
+        paginator.count = count
+        page = Page(rows, number, paginator)
+        page.next_cursor = (
+            encode_cursor(rows[-1], number + 1, 'n')
+            if has_next and rows else None
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], number - 1, 'p')
+            if number > 1 and rows else None
+        )
+        page.page_links = self._page_links(number, paginator.num_pages)
+        return paginator, page
+
+    def _page_links(self, number, num_pages):
+        last = min(num_pages, self.max_offset_pages, number + LINKS_AROUND)
+        links = list(range(max(1, number - LINKS_AROUND), last + 1))
+        if number > self.max_offset_pages:
+            links.append(number)
+        return links
+
+
+def paginate(request, queryset, per_page=PER_PAGE):
+    """Shortcut returning ``(paginator, page)`` for a feed queryset."""
+    return KeysetPaginator(queryset, per_page).get_page(request)
+
+
+def estimate_rows(queryset):
+    """Roughly count the rows of the queryset's table without a scan.
+
+    PostgreSQL keeps an estimate in ``pg_class``; elsewhere the span of
+    primary keys is read from the two ends of the index.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                           [model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0]) if row else 0
+    bounds = model._default_manager.using(queryset.db).aggregate(
+        first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return 0
+    return bounds['last'] - bounds['first'] + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists of large tables.
+
+    Up to ``EXACT_COUNT_LIMIT`` rows are counted exactly, with a bounded
+    COUNT. Past that an unfiltered table is estimated by
+    ``estimate_rows``, and a filtered one stops at the limit.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        exact = queryset[:EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        if queryset.query.where:
+            return EXACT_COUNT_LIMIT
+        return max(estimate_rows(queryset), exact)
@@ -0,0 +1,199 @@
+"""Full-text search over posts and comments with SQLite FTS5.
+
+Post texts are indexed in ``posts_post_search`` under the post id and
+comment texts in ``posts_comment_search`` under the comment id, together
+with the id of their post. Both are kept in sync by the save and delete
+signals; rows written around them (``update()``, fixtures) are picked up
+by ``manage.py rebuild_search``. A query matches the posts whose text or
+comments contain every word of it as a prefix, ranked by BM25. As in
+the feeds, only the first ``MAX_OFFSET_PAGES`` pages of matches are
+counted and served.
+
+On other database backends the tables do not exist and ``SearchResults``
+falls back to unranked ``icontains`` lookups.
+"""
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from posts.models import Post
+from posts.paginator import LINKS_AROUND, MAX_OFFSET_PAGES, PER_PAGE
+
+POST_TABLE = 'posts_post_search'
+COMMENT_TABLE = 'posts_comment_search'
+# BM25 scores are negative, a match in a comment counts half as much.
+COMMENT_WEIGHT = 0.5
+MAX_TERMS = 10
+WORD = re.compile(r'\w+')
+
+REBUILD_SQL = [
+    f'DELETE FROM {POST_TABLE}',
+    f'DELETE FROM {COMMENT_TABLE}',
+    f'INSERT INTO {POST_TABLE} (rowid, text) SELECT id, text FROM posts_post',
+    f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+    f'SELECT id, text, post_id FROM posts_comment',
+    f"INSERT INTO {POST_TABLE} ({POST_TABLE}) VALUES ('optimize')",
+    f"INSERT INTO {COMMENT_TABLE} ({COMMENT_TABLE}) VALUES ('optimize')",
+]
+MATCHES_SQL = f'''
+    SELECT rowid AS post_id FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s
+    UNION ALL
+    SELECT post_id FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s
+'''
+# The best matches of one table, FTS5 ranks by BM25 with a bounded sort.
+POST_RANKED_SQL = (
+    f'SELECT rowid, rank FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s '
+    f'ORDER BY rank LIMIT %s'
+)
+COMMENT_RANKED_SQL = (
+    f'SELECT post_id, rank * {COMMENT_WEIGHT} FROM {COMMENT_TABLE} '
+    f'WHERE {COMMENT_TABLE} MATCH %s ORDER BY rank LIMIT %s'
+)
+
+
+def enabled():
+    return connection.vendor == 'sqlite'
+
+
+def _execute(sql, params=()):
+    if enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def index_post(post):
+    _execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s', [post.id])
+    _execute(f'INSERT INTO {POST_TABLE} (rowid, text) VALUES (%s, %s)',
+             [post.id, post.text])
+
+
+def unindex_post(post):
+    _execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s', [post.id])
+    _execute(f'DELETE FROM {COMMENT_TABLE} WHERE post_id = %s', [post.id])
+
+
+def index_comment(comment):
+    _execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [comment.id])
+    _execute(f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+             f'VALUES (%s, %s, %s)',
+             [comment.id, comment.text, comment.post_id])
+
+
+def unindex_comment(comment):
+    _execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [comment.id])
+
+
+def rebuild():
+    """Reindex every post and comment and merge the index segments."""
+    for sql in REBUILD_SQL:
+        _execute(sql)
+
+
+def parse(query):
+    """Turn user input into an FTS5 query, or '' if there is no word."""
+    words = WORD.findall(query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_posts(queryset, query):
+    """Narrow a post queryset down to posts whose text matches."""
+    match = parse(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s',
+        [match]))
+
+
+class SearchResults:
+    """Ranked posts matching a query, sliceable like a queryset.
+
+    Only the requested slice of post ids is read from the index, and the
+    posts of that slice are loaded with one feed query.
+    """
+
+    def __init__(self, query, limit=PER_PAGE * MAX_OFFSET_PAGES):
+        self.query = query
+        self.match = parse(query)
+        self.limit = limit
+
+    def count(self):
+        """Count the matching posts, but never more than ``limit``."""
+        if not self.match:
+            return 0
+        if not enabled():
+            return self._fallback()[:self.limit].count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM (SELECT DISTINCT post_id '
+                f'FROM ({MATCHES_SQL}) LIMIT %s)',
+                [self.match, self.match, self.limit])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if not self.match or stop is None or stop <= start:
+            return []
+        if not enabled():
+            return list(self._fallback()[start:stop])
+        # A post ranks by its best match in the post or comment index, so
+        # the first ``stop`` posts are among the first ``stop`` of each.
+        scores = self._best(POST_RANKED_SQL, stop)
+        for post_id, score in self._best(COMMENT_RANKED_SQL, stop).items():
+            scores[post_id] = min(scores.get(post_id, score), score)
+        ids = sorted(scores, key=lambda post_id: (
+            scores[post_id], -post_id))[start:stop]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+    def _best(self, sql, stop):
+        """Return ``{post id: best score}`` of the ``stop`` best posts of
+        one index.
+
+        A post has many comments, so while the rows read name fewer
+        posts, twice as many are read again.
+        """
+        limit = stop
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(sql, [self.match, limit])
+                rows = cursor.fetchall()
+                best = {}
+                for post_id, score in rows:
+                    best.setdefault(post_id, score)
+                if len(best) >= stop or len(rows) < limit:
+                    return best
+                limit *= 2
+
+    def _fallback(self):
+        condition = Q()
+        for word in WORD.findall(self.query)[:MAX_TERMS]:
+            condition &= (Q(text__icontains=word)
+                          | Q(comments__text__icontains=word))
+        return Post.objects.feed().filter(condition).distinct()
+
+
+def paginate(request, query, per_page=PER_PAGE):
+    """Return ``(paginator, page)`` of search results for the request."""
+    paginator = Paginator(
+        SearchResults(query, per_page * MAX_OFFSET_PAGES), per_page)
+    try:
+        number = min(max(int(request.GET.get('page')), 1),
+                     MAX_OFFSET_PAGES)
+    except (TypeError, ValueError):
+        number = 1
+    page = paginator.get_page(number)
+    page.page_links = [
+        link for link in range(page.number - LINKS_AROUND,
+                               page.number + LINKS_AROUND + 1)
+        if 1 <= link <= paginator.num_pages
+    ]
+    return paginator, page
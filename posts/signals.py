@@ -0,0 +1,127 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from posts import caching, counters, search, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _follow_scopes(follow):
+    return [
+        f'author:{follow.author_id}', f'author:{follow.user_id}',
+        f'follower:{follow.user_id}',
+    ]
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def rename_author(sender, instance, created, raw=False, update_fields=None,
+                  **kwargs):
+    # A login only writes last_login, which no page shows.
+    if created or raw or update_fields == frozenset(['last_login']):
+        return
+    slugs = Group.objects.filter(posts__author=instance).values_list(
+        'slug', flat=True).distinct()
+    commented = Comment.objects.filter(author=instance).values_list(
+        'post_id', flat=True).distinct()
+    caching.bump('global', f'author:{instance.pk}',
+                 *(f'group:{slug}' for slug in slugs),
+                 *(f'post:{post_id}' for post_id in commented))
+
+
+@receiver(pre_save, sender=Post)
+def prepare_post(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance._state.adding:
+        instance.fanned_out = timeline.should_fan_out(instance.author_id)
+    else:
+        # No row means the post was deleted meanwhile and is inserted again.
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', 'image').first() or (
+                None, None)
+
+
+@receiver(post_save, sender=Post)
+def publish_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump(instance.author_id, posts_count=1)
+        if instance.fanned_out:
+            timeline.fan_out(instance)
+    search.index_post(instance)
+    caching.bump(*caching.post_scopes(
+        instance, getattr(instance, '_old_group_id', None)))
+    if instance.image and instance.image != getattr(
+            instance, '_old_image', None):
+        transaction.on_commit(lambda: thumbnails.queue_post(instance))
+
+
+@receiver(post_delete, sender=Post)
+def unpublish_post(sender, instance, **kwargs):
+    counters.bump(instance.author_id, posts_count=-1)
+    search.unindex_post(instance)
+    caching.bump(*caching.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def add_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_comment(instance)
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        caching.bump(*caching.post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def delete_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    search.unindex_comment(instance)
+    caching.bump(*caching.post_scopes(instance.post))
+
+
+@receiver(post_save, sender=Follow)
+def follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump(instance.author_id, followers_count=1)
+        counters.bump(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        caching.bump(*_follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow(sender, instance, **kwargs):
+    counters.bump(instance.author_id, followers_count=-1)
+    counters.bump(instance.user_id, following_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    caching.bump(*_follow_scopes(instance))
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def change_group(sender, instance, raw=False, **kwargs):
+    # Posts of the group are moved or relabelled without signals of their
+    # own, so every page showing them is invalidated here.
+    if raw or instance.pk is None:
+        return
+    old_slug = Group.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True).first()
+    authors = Post.objects.filter(group=instance).values_list(
+        'author_id', flat=True).distinct()
+    caching.bump(f'group:{old_slug}',
+                 *(f'author:{author_id}' for author_id in authors))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_groups(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump('global', 'groups', f'group:{instance.slug}')
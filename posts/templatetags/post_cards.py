@@ -0,0 +1,48 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts.caching import HARD_TIMEOUT, get_versions, version_digest
+
+register = template.Library()
+
+
+def _scopes(post):
+    scopes = [f'post:{post.id}', f'author:{post.author_id}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Render includes/post_item.html for every post, card by card cached.
+
+    A card is keyed on the versions of its post, author and group, so a
+    write re-renders only the cards it touched. Cards are the same for
+    every viewer, the edit button is a hole.
+    """
+    posts = list(posts)
+    scopes = [_scopes(post) for post in posts]
+    versions = iter(get_versions(*(
+        scope for post_scopes in scopes for scope in post_scopes)))
+    keys = [
+        'card:{}:{}'.format(
+            post.id, version_digest(next(versions) for _ in post_scopes))
+        for post, post_scopes in zip(posts, scopes)
+    ]
+    cards = cache.get_many(keys)
+    missing = {}
+    item = get_template('includes/post_item.html')
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            cards[key] = missing[key] = item.render({'post': post})
+    if missing:
+        cache.set_many(missing, HARD_TIMEOUT)
+    return mark_safe(''.join(cards[key] for key in keys))
+
+
+@register.simple_tag
+def post_card(post):
+    return post_cards([post])
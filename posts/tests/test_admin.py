@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User
+from posts.paginator import EstimatedCountPaginator
+from posts.tests.base_class import PostBaseTestClass
+
+
+class AdminTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.authorized_client.force_login(self.admin)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            user = User.objects.create(
+                username=f'user{User.objects.count()}')
+            post = Post.objects.create(text='Admin post.', author=user,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=user, text='Comment.')
+            Follow.objects.create(user=user, author=self.user)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        for model in ('post', 'comment', 'follow'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            self.add_rows(2)
+            few = self.queries(url)
+            self.add_rows(10)
+            with self.subTest(model=model):
+                self.assertEqual(self.queries(url), few)
+
+    def test_change_forms_do_not_list_every_row(self):
+        self.add_rows(5)
+        for model, obj in (('post', self.post), ('comment', self.comment),
+                           ('follow', Follow.objects.first())):
+            response = self.authorized_client.get(
+                reverse(f'admin:posts_{model}_change', args=[obj.pk]))
+            with self.subTest(model=model):
+                self.assertNotContains(response, 'user4</option>')
+
+    def test_post_search_uses_index(self):
+        response = self.authorized_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'meaningless'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+
+    def test_paginator_estimates_large_tables(self):
+        self.add_rows(5)
+        posts = Post.objects.order_by('-pub_date')
+        ids = posts.values_list('pk', flat=True)
+        with mock.patch('posts.paginator.EXACT_COUNT_LIMIT', 3):
+            self.assertEqual(EstimatedCountPaginator(posts, 2).count,
+                             max(ids) - min(ids) + 1)
+            self.assertEqual(EstimatedCountPaginator(
+                posts.filter(group=self.group), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(posts, 2).count, 6)
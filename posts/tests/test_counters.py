@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from posts.models import Comment, Follow, Post, UserStats
+from posts.tests.base_class import PostBaseTestClass
+
+
+class CountersTest(PostBaseTestClass):
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_writes_keep_counters_in_sync(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        Post.objects.create(text='Second post.', author=self.user)
+        self.assertEqual(self.stats(self.user).posts_count, 2)
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.impostor).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        self.comment.delete()
+        Follow.objects.all().delete()
+        self.post.delete()
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.assertEqual(self.stats(self.user).followers_count, 0)
+        self.assertEqual(self.stats(self.impostor).following_count, 0)
+
+    def test_command_detects_and_repairs_drift(self):
+        Post.objects.update(comments_count=7)
+        UserStats.objects.filter(user=self.user).delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', check=True, stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        call_command('rebuild_counters', check=True, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count,
+                         Comment.objects.filter(post=self.post).count())
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+
+    def test_drifted_counters_do_not_go_negative(self):
+        Post.objects.update(comments_count=0)
+        UserStats.objects.update(posts_count=0, followers_count=0,
+                                 following_count=0)
+        Follow.objects.bulk_create(
+            [Follow(user=self.impostor, author=self.user)])
+        self.comment.delete()
+        Follow.objects.all().delete()
+        self.post.delete()
+        stats = self.stats(self.user)
+        self.assertEqual((stats.posts_count, stats.followers_count), (0, 0))
+        self.assertEqual(self.stats(self.impostor).following_count, 0)
+
+    def test_saving_a_stale_post_keeps_its_counter(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user, text='Two')
+        stale.text = 'Edited.'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.text, self.post.comments_count),
+                         ('Edited.', 2))
+        # A post deleted meanwhile is inserted again, as by Model.save().
+        Post.objects.filter(pk=stale.pk).delete()
+        stale.save()
+        self.assertTrue(Post.objects.filter(pk=stale.pk).exists())
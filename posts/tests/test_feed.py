@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.tests.base_class import PostBaseTestClass
+
+
+class FeedQueriesTest(PostBaseTestClass):
+    """Feed pages cost the same number of queries however many comments."""
+
+    def setUp(self):
+        super().setUp()
+        Follow.objects.create(user=self.impostor, author=self.user)
+        for i in range(5):
+            Post.objects.create(text=f'Post {i}', author=self.user,
+                                group=self.group)
+        self.pages = {
+            reverse('index'): 3,
+            reverse('group_posts', kwargs={'slug': 'testgroup'}): 4,
+            reverse('profile', kwargs={'username': 'testsubject'}): 5,
+            reverse('follow_index'): 4,
+            reverse('post', kwargs={'username': 'testsubject',
+                                    'post_id': self.post.id}): 5,
+        }
+
+    def add_comments(self, count):
+        # Saved one by one, so the comment counters follow.
+        for post in Post.objects.all():
+            for _ in range(count):
+                Comment.objects.create(post=post, author=self.impostor,
+                                       text='Me too!')
+
+    def assert_queries(self):
+        for url, queries in self.pages.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.not_author.get(url)
+
+    def test_query_count_does_not_depend_on_comments(self):
+        self.assert_queries()
+        self.add_comments(20)
+        self.assert_queries()
+        content = self.not_author.get(reverse('index')).content.decode()
+        # The first post also has the comment of the base class.
+        self.assertEqual(content.count('Комментариев: 20'), 5)
+        self.assertEqual(content.count('Комментариев: 21'), 1)
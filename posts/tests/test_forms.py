@@ -1,9 +1,18 @@
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
 from django.test import override_settings
 from django.urls import reverse
 
 import tempfile
+from io import BytesIO
+from unittest import mock
 
+from PIL import Image, ImageCms
+
+from posts.forms import PostForm
+from posts.images import ORIENTATION, UploadSizeLimitHandler
 from posts.models import Post, Comment
 from posts.tests.base_class import PostBaseTestClass
 
@@ -84,3 +93,103 @@ class PostsFormsTest(PostBaseTestClass):
         self.assertEqual(comment.post, self.post)
         self.assertEqual(comment.text, form_data['text'])
         self.assertEqual(comment.author, self.user)
+
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir(), IMAGE_MAX_SIDE=100)
+class ImageIngestTest(PostBaseTestClass):
+
+    def upload(self, size, image_format='JPEG', name='photo.jpg'):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def bound_form(self, image):
+        return PostForm({'text': 'With a picture.'}, {'image': image})
+
+    def test_image_is_stored_before_the_queued_insert(self):
+        stored = []
+
+        def insert(save):
+            # Only the row is left for the writer thread.
+            stored.append(save.__self__.image.name)
+            self.assertTrue(default_storage.exists(stored[0]))
+            raise DatabaseError('locked')
+
+        with mock.patch('posts.views.write_queue.run', side_effect=insert), \
+                self.assertRaises(DatabaseError):
+            self.authorized_client.post(reverse('new_post'), {
+                'text': 'Stored first.', 'image': self.upload((50, 50))})
+        self.assertFalse(default_storage.exists(stored[0]))
+
+    def test_small_image_is_kept_as_is(self):
+        image = self.upload((80, 40))
+        form = self.bound_form(image)
+        self.assertTrue(form.is_valid())
+        self.assertIs(form.cleaned_data['image'], image)
+
+    def test_large_image_is_downscaled(self):
+        for image_format, name in (('JPEG', 'photo.jpg'),
+                                   ('PNG', 'photo.png'),
+                                   ('BMP', 'photo.bmp')):
+            with self.subTest(image_format=image_format):
+                form = self.bound_form(
+                    self.upload((800, 400), image_format, name))
+                self.assertTrue(form.is_valid())
+                image = form.cleaned_data['image']
+                with Image.open(image) as stored:
+                    self.assertEqual(stored.size, (100, 50))
+                    self.assertIn(stored.format, ('JPEG', 'PNG'))
+
+    def test_downscaled_photo_is_upright_with_its_profile(self):
+        photo = Image.new('RGB', (800, 400), 'blue')
+        photo.paste('red', (0, 0, 400, 400))
+        exif = Image.Exif()
+        # Stored sideways, shown turned a quarter clockwise.
+        exif[ORIENTATION] = 6
+        profile = ImageCms.ImageCmsProfile(
+            ImageCms.createProfile('sRGB')).tobytes()
+        buffer = BytesIO()
+        photo.save(buffer, 'JPEG', exif=exif, icc_profile=profile)
+        form = self.bound_form(
+            SimpleUploadedFile('photo.jpg', buffer.getvalue()))
+        self.assertTrue(form.is_valid())
+        with Image.open(form.cleaned_data['image']) as stored:
+            self.assertEqual(stored.size, (50, 100))
+            self.assertIsNone(stored.getexif().get(ORIENTATION))
+            self.assertEqual(stored.info.get('icc_profile'), profile)
+            red, green, blue = stored.convert('RGB').getpixel((25, 10))
+            self.assertGreater(red, blue)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_are_rejected_from_the_header(self):
+        form = self.bound_form(self.upload((800, 400)))
+        with mock.patch.object(Image.Image, 'load') as load:
+            self.assertFalse(form.is_valid())
+        load.assert_not_called()
+        self.assertEqual(form.errors['image'][0],
+                         'Изображение больше 1000 пикселей.')
+
+    @override_settings(IMAGE_MAX_DECODE_MEMORY=100 * 100 * 3)
+    def test_decode_memory_is_capped(self):
+        self.assertFalse(self.bound_form(
+            self.upload((800, 800), 'PNG', 'photo.png')).is_valid())
+        # JPEG is decoded at 1/8 of its size, within the cap.
+        self.assertTrue(self.bound_form(self.upload((800, 800))).is_valid())
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_cut_off_while_streaming(self):
+        handler = UploadSizeLimitHandler()
+        self.assertEqual(handler.receive_data_chunk(b'x' * 1024, 0),
+                         b'x' * 1024)
+        with self.assertRaises(RequestDataTooBig):
+            handler.receive_data_chunk(b'x', 1024)
+        posts_count = Post.objects.count()
+        response = self.authorized_client.post(reverse('new_post'), {
+            'text': 'Too big.', 'image': self.upload((200, 200), 'BMP',
+                                                     'photo.bmp')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_upload_size_is_capped(self):
+        self.assertFalse(self.bound_form(self.upload((80, 40))).is_valid())
@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from posts import counters, search
+from posts.models import Comment, Follow, Group, Post, Timeline, User
+from posts.tests.base_class import PostBaseTestClass
+
+SIZES = {'users': 30, 'groups': 3, 'posts': 200, 'comments': 100,
+         'follows': 4, 'batch_size': 17}
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=3)
+class GenerateDataTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def generate(self, **options):
+        call_command('generate_data', stdout=StringIO(),
+                     **{**SIZES, **options})
+
+    def snapshot(self):
+        return (
+            list(User.objects.filter(id__gt=self.impostor.id).values_list(
+                'username', flat=True)),
+            list(Follow.objects.values_list('user__username',
+                                            'author__username')),
+            list(Post.objects.exclude(id=self.post.id).values_list(
+                'author__username', 'group__description', 'text', 'image',
+                'fanned_out', 'pub_date')),
+            list(Comment.objects.exclude(id=self.comment.id).values_list(
+                'post__text', 'author__username', 'text', 'created')),
+        )
+
+    def test_generates_consistent_dataset(self):
+        models = {User: 'users', Group: 'groups', Post: 'posts',
+                  Comment: 'comments'}
+        before = {model: model.objects.count() for model in models}
+        self.generate()
+        for model, size in models.items():
+            self.assertEqual(model.objects.count(),
+                             before[model] + SIZES[size])
+        # Popular authors pass the fan-out limit and are pulled on read.
+        self.assertTrue(Post.objects.filter(fanned_out=False).exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+        self.assertFalse(any(counters.drift().values()))
+        pushed = sum(
+            Follow.objects.filter(author_id=author_id).count()
+            for author_id in Post.objects.filter(
+                fanned_out=True).values_list('author_id', flat=True))
+        self.assertEqual(Timeline.objects.count(), pushed)
+        self.assertTrue(search.SearchResults('город').count())
+
+    def test_same_seed_gives_same_rows(self):
+        self.generate()
+        first = self.snapshot()
+        User.objects.filter(id__gt=self.impostor.id).delete()
+        Group.objects.filter(slug__startswith='group-').delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+        User.objects.filter(id__gt=self.impostor.id).delete()
+        Group.objects.filter(slug__startswith='group-').delete()
+        self.generate(seed=2)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_cached_pages_are_dropped(self):
+        cache.set('page', 'stale')
+        self.generate(images=0)
+        self.assertIsNone(cache.get('page'))
+
+    def test_dates_are_relative_to_now_option(self):
+        self.generate(images=0, now='2020-06-01T12:00:00+00:00')
+        latest = Post.objects.exclude(id=self.post.id).latest('pub_date')
+        self.assertEqual(latest.pub_date,
+                         datetime(2020, 6, 1, 12, tzinfo=timezone.utc))
+
+    def test_invalid_options_are_rejected(self):
+        cases = [
+            {'users': 0},
+            {'posts': -1},
+            {'batch_size': 0},
+            {'now': 'yesterday'},
+        ]
+        for options in cases:
+            with self.subTest(options=options), \
+                    self.assertRaises(CommandError):
+                self.generate(images=0, **options)
@@ -0,0 +1,77 @@
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Post
+from posts.paginator import KeysetPaginator, decode_cursor, encode_cursor
+from posts.tests.base_class import PostBaseTestClass
+
+
+class KeysetPaginatorTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        Post.objects.bulk_create(
+            Post(text=f'Post number {i}', author=self.user)
+            for i in range(24)
+        )
+        self.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True))
+
+    def get_page(self, **params):
+        response = self.guest_client.get(reverse('index'), params)
+        return response.context.get('page')
+
+    def test_cursors_walk_the_whole_feed(self):
+        page = self.get_page()
+        seen = [post.id for post in page]
+        while page.next_cursor:
+            page = self.get_page(cursor=page.next_cursor)
+            seen += [post.id for post in page]
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+
+    def test_previous_cursor_returns_same_posts(self):
+        first = self.get_page()
+        second = self.get_page(cursor=first.next_cursor)
+        back = self.get_page(cursor=second.previous_cursor)
+        self.assertEqual(back.number, 1)
+        self.assertEqual(list(back), list(first))
+        self.assertIsNone(back.previous_cursor)
+
+    def test_shallow_page_numbers_still_work(self):
+        page = self.get_page(page=2)
+        self.assertEqual(page.number, 2)
+        self.assertEqual([post.id for post in page], self.expected[10:20])
+
+    def test_out_of_range_page_falls_back_to_last_page(self):
+        page = self.get_page(page=999)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        page = self.get_page(cursor='not-a-cursor')
+        self.assertEqual(page.number, 1)
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_out_of_range_cursor_falls_back_to_first_page(self):
+        huge = Post(id=10 ** 30, pub_date=self.post.pub_date)
+        early = Post(id=1, pub_date=parse_datetime(
+            '0001-01-01T00:00:00+05:00'))
+        for post in (huge, early):
+            cursor = encode_cursor(post, 2, 'n')
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                page = self.get_page(cursor=cursor)
+                self.assertEqual(page.number, 1)
+                self.assertEqual([post.id for post in page],
+                                 self.expected[:10])
+
+    def test_count_is_bounded(self):
+        paginator, page = KeysetPaginator(
+            Post.objects.all(), per_page=5, count_limit=11
+        ).get_page(RequestFactory().get(reverse('index')))
+        self.assertEqual(paginator.count, 11)
+        self.assertEqual(page.page_links, [1, 2, 3])
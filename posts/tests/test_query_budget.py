@@ -0,0 +1,147 @@
+import json
+import os
+import re
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import views
+from posts.models import Follow, Group, Post, User
+from posts.tests.base_class import PostBaseTestClass
+
+SNAPSHOT = os.path.join(os.path.dirname(__file__), 'snapshots',
+                        'query_plans.json')
+# Datasets generated on top of each other, the pages must not need more
+# queries or other plans as they grow.
+SIZES = [
+    {'users': 10, 'groups': 2, 'posts': 200, 'comments': 400, 'follows': 3},
+    {'users': 40, 'groups': 4, 'posts': 1000, 'comments': 2000,
+     'follows': 3},
+]
+FOLLOWED = 3
+# Views that only render a static template.
+UNCHECKED = {'server_error'}
+TRANSACTION = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO)\b')
+ROWS = re.compile(r'(; UNION ALL; SCAN CONSTANT ROW)+')
+
+
+def _plan(steps):
+    # SQLite before 3.36 says "SCAN TABLE x" where later ones say "SCAN x".
+    plan = '; '.join(re.sub(r'^(SCAN|SEARCH) TABLE ', r'\1 ', step)
+                     for step in steps)
+    # A bulk insert selects a constant row per object.
+    return ROWS.sub(r'\1...', plan)
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=5)
+class QueryBudgetTest(PostBaseTestClass):
+    """Every view runs a fixed set of queries with fixed plans.
+
+    The plans are compared with ``snapshots/query_plans.json``; after an
+    intended change rewrite it with ``UPDATE_QUERY_PLANS=1``.
+    """
+
+    def generate(self, size):
+        call_command('generate_data', stdout=StringIO(), images=0, **size)
+        authors = User.objects.annotate(
+            written=Count('posts')).order_by('-written', 'id')
+        for author in authors[:FOLLOWED]:
+            if author != self.impostor:
+                Follow.objects.get_or_create(user=self.impostor,
+                                             author=author)
+
+    def pages(self):
+        """Yield ``(view name, request)`` of every view."""
+        # Branches taken depend on the data, so every size gets an author
+        # with pushed posts that is not followed yet and a post in a group.
+        author = User.objects.filter(posts__fanned_out=True).exclude(
+            following__user=self.impostor).exclude(id=self.impostor.id
+        ).annotate(written=Count('posts')).order_by('-written', 'id')[0]
+        post = Post.objects.filter(group__isnull=False).order_by(
+            '-comments_count', 'id').first()
+        group = Group.objects.annotate(
+            size=Count('posts')).order_by('-size', 'id').first()
+        guest, user = self.guest_client, self.not_author
+        yield 'index', lambda: guest.get(reverse('index'))
+        yield 'group_list', lambda: guest.get(reverse('group_list'))
+        yield 'group_posts', lambda: guest.get(
+            reverse('group_posts', args=[group.slug]))
+        yield 'search', lambda: guest.get(reverse('search'), {'q': 'город'})
+        yield 'profile', lambda: guest.get(
+            reverse('profile', args=[author.username]))
+        yield 'post_view', lambda: guest.get(
+            reverse('post', args=[post.author.username, post.id]))
+        yield 'page_not_found', lambda: guest.get('/no/such/page/')
+        yield 'follow_index', lambda: user.get(reverse('follow_index'))
+        yield 'new_post', lambda: user.get(reverse('new_post'))
+        yield 'post_edit', lambda: self.authorized_client.get(
+            reverse('post_edit', args=[self.user.username, self.post.id]))
+        yield 'add_comment', lambda: user.post(
+            reverse('add_comment', args=[post.author.username, post.id]),
+            {'text': 'Ещё один комментарий.'})
+        yield 'profile_follow', lambda: user.get(
+            reverse('profile_follow', args=[author.username]))
+        yield 'profile_unfollow', lambda: user.get(
+            reverse('profile_unfollow', args=[author.username]))
+
+    def plans(self):
+        """Return ``{view name: [plan of every query]}``."""
+        plans = {}
+        for name, request in self.pages():
+            # Every view runs, no page comes from the cache.
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertLess(request().status_code, 500, name)
+            plans[name] = []
+            for query in queries:
+                sql = query['sql']
+                if TRANSACTION.match(sql):
+                    plans[name].append(sql.split()[0])
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans[name].append(
+                        _plan(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_every_view_is_checked(self):
+        self.generate(SIZES[0])
+        names = {
+            name for name, value in vars(views).items()
+            if callable(value) and not name.startswith('_')
+            and getattr(value, '__module__', None) == views.__name__
+        }
+        self.assertEqual(names - UNCHECKED,
+                         {name for name, _ in self.pages()})
+
+    def test_queries_do_not_grow_with_data(self):
+        measured = []
+        for size in SIZES:
+            self.generate(size)
+            measured.append(self.plans())
+        smallest, *larger = measured
+        for plans in larger:
+            for name, queries in plans.items():
+                with self.subTest(view=name):
+                    self.assertEqual(len(queries), len(smallest[name]))
+                    self.assertEqual(queries, smallest[name])
+
+        if os.getenv('UPDATE_QUERY_PLANS'):
+            os.makedirs(os.path.dirname(SNAPSHOT), exist_ok=True)
+            with open(SNAPSHOT, 'w') as file:
+                json.dump(smallest, file, ensure_ascii=False, indent=2)
+                file.write('\n')
+        with open(SNAPSHOT) as file:
+            snapshot = json.load(file)
+        for name, queries in smallest.items():
+            with self.subTest(view=name):
+                self.assertEqual(
+                    queries, snapshot.get(name),
+                    f'The queries of {name} changed, rerun with '
+                    f'UPDATE_QUERY_PLANS=1 if that is intended.')
@@ -0,0 +1,60 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow
+from posts.tests.base_class import PostBaseTestClass
+
+# A step reading a whole table rather than an index range.
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+class QueryPlanTest(PostBaseTestClass):
+    """The main query of every feed is read in order from an index."""
+
+    def plans(self, client, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(url).status_code, 200)
+        plans = []
+        for query in queries:
+            sql = query['sql']
+            if f'FROM "{table}"' not in sql or 'ORDER BY' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        self.assertTrue(plans, f'No ordered query on {table} for {url}.')
+        return plans
+
+    def assertIndexedPlan(self, sql, steps, sorted_in_memory=False):
+        message = f'{sql}\n' + '\n'.join(steps)
+        self.assertFalse(
+            [step for step in steps if FULL_SCAN.match(step)], message)
+        if not sorted_in_memory:
+            self.assertNotIn(TEMP_SORT, steps, message)
+
+    def test_feed_queries_use_indexes(self):
+        cases = [
+            (reverse('index'), 'posts_post'),
+            (reverse('group_posts', args=[self.group.slug]), 'posts_post'),
+            (reverse('profile', args=[self.user.username]), 'posts_post'),
+            (reverse('post', args=[self.user.username, self.post.id]),
+             'posts_comment'),
+        ]
+        for url, table in cases:
+            for sql, steps in self.plans(self.guest_client, url, table):
+                with self.subTest(url=url):
+                    self.assertIndexedPlan(sql, steps)
+
+    def test_follow_feed_queries_use_indexes(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        timeline, pulled = self.plans(
+            self.not_author, reverse('follow_index'), 'posts_post')
+        self.assertIndexedPlan(*timeline)
+        # Posts pulled from several authors are merged by a sort, but each
+        # author's posts are still an index range, never the whole table.
+        self.assertIndexedPlan(*pulled, sorted_in_memory=True)
+        self.assertIn('USING INDEX post_author_feed_idx', '\n'.join(pulled[1]))
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.search import SearchResults
+from posts.tests.base_class import PostBaseTestClass
+
+
+class SearchTest(PostBaseTestClass):
+
+    def results(self, query):
+        return list(SearchResults(query)[:100])
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.results('meaningless'), [self.post])
+        self.assertEqual(self.results('expectations'), [self.post])
+
+        self.post.text = 'Совсем другие слова.'
+        self.post.save()
+        self.assertEqual(self.results('meaningless'), [])
+        self.assertEqual(self.results('другие'), [self.post])
+
+        self.comment.delete()
+        self.assertEqual(self.results('expectations'), [])
+        self.post.delete()
+        self.assertEqual(self.results('другие'), [])
+
+    def test_every_word_matches_as_prefix(self):
+        self.assertEqual(self.results('Meaning SET'), [self.post])
+        self.assertEqual(self.results('meaning nothing'), [])
+        self.assertEqual(self.results('" OR *'), [])
+
+    def test_post_text_ranks_above_comments(self):
+        other = Post.objects.create(text='Nothing to see.', author=self.user)
+        Comment.objects.create(post=other, author=self.user,
+                               text='Meaningless remark.')
+        self.assertEqual(self.results('meaningless'), [self.post, other])
+        self.assertEqual(SearchResults('meaningless').count(), 2)
+
+    def test_comments_of_one_post_do_not_crowd_out_others(self):
+        chatty = Post.objects.create(text='Chatty.', author=self.user)
+        quiet = Post.objects.create(text='Quiet.', author=self.user)
+        for _ in range(5):
+            Comment.objects.create(post=chatty, author=self.user,
+                                   text='Remarkable.')
+        Comment.objects.create(post=quiet, author=self.user,
+                               text='Remarkable and long enough to rank '
+                                    'below the short ones.')
+        results = SearchResults('remarkable')
+        self.assertEqual(results[0:1], [chatty])
+        self.assertEqual(results[1:2], [quiet])
+
+    def test_rebuild_picks_up_unsignalled_writes(self):
+        Post.objects.update(text='Updated in bulk.')
+        self.assertEqual(self.results('bulk'), [])
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(self.results('bulk'), [self.post])
+        self.assertEqual(self.results('meaningless'), [])
+
+    def test_view_paginates_results(self):
+        Post.objects.bulk_create([
+            Post(text=f'Meaningless post {number}.', author=self.user)
+            for number in range(10)
+        ])
+        call_command('rebuild_search', stdout=StringIO())
+        url = reverse('search')
+        response = self.guest_client.get(url, {'q': 'meaningless'})
+        self.assertEqual(response.context['paginator'].count, 11)
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertContains(response, '?q=meaningless&amp;page=2')
+
+        response = self.guest_client.get(url, {'q': 'meaningless',
+                                               'page': 2})
+        self.assertEqual(len(response.context['page']), 1)
+
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 0)
@@ -0,0 +1,88 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from io import StringIO
+from unittest import mock
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import CommandError
+from django.test import SimpleTestCase
+
+from posts.management.commands import serve
+
+
+class ServeCommandTest(SimpleTestCase):
+
+    def serve(self, *options):
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+             'serve', '127.0.0.1:0', *options],
+            stdout=subprocess.PIPE, text=True, env={
+                **os.environ, 'DJANGO_CACHE_LOCATION':
+                settings.CACHES['default']['LOCATION']})
+        self.addCleanup(self.stop, server)
+        port = re.search(r':(\d+)/', server.stdout.readline()).group(1)
+        return server, int(port)
+
+    def stop(self, server):
+        # Killing only the master would leave its workers behind.
+        server.terminate()
+        try:
+            server.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    def test_workers_are_recycled_and_stopped(self):
+        server, port = self.serve('--workers', '2', '--max-requests', '2',
+                                  '--max-requests-jitter', '0')
+        for _ in range(6):
+            with urlopen(f'http://127.0.0.1:{port}/about/author/',
+                         timeout=10) as response:
+                self.assertEqual(response.status, 200)
+        server.send_signal(signal.SIGTERM)
+        output, _ = server.communicate(timeout=10)
+        self.assertEqual(server.returncode, 0)
+        # Workers retire after two requests each and are replaced.
+        self.assertGreaterEqual(output.count('Booted worker'), 4)
+        self.assertEqual(output.count('Booted worker'),
+                         output.count('exited with status 0'))
+
+    def test_idle_client_is_dropped(self):
+        server, port = self.serve('--workers', '1', '--timeout', '0.5')
+        idle = socket.create_connection(('127.0.0.1', port))
+        self.addCleanup(idle.close)
+        with urlopen(f'http://127.0.0.1:{port}/about/author/',
+                     timeout=10) as response:
+            self.assertEqual(response.status, 200)
+        # The worker closed the silent connection.
+        self.assertEqual(idle.recv(1), b'')
+
+    def test_crashing_workers_are_respawned_with_backoff(self):
+        command = serve.Command(stdout=StringIO())
+        command.workers, command.quick_deaths, command.respawn_at = {}, 0, 0
+        command.stopping = False
+        delays = []
+        with mock.patch('os.waitpid', return_value=(1, 1 << 8)):
+            for _ in range(serve.MAX_QUICK_DEATHS - 1):
+                command.workers[1] = time.monotonic()
+                command.reap()
+                delays.append(command.respawn_at - time.monotonic())
+            command.workers[1] = time.monotonic()
+            with self.assertRaises(CommandError):
+                command.reap()
+        self.assertAlmostEqual(delays[0], serve.RESPAWN_DELAY, delta=0.05)
+        self.assertAlmostEqual(delays[1], 2 * serve.RESPAWN_DELAY,
+                               delta=0.05)
+        self.assertAlmostEqual(delays[-1], serve.MAX_RESPAWN_DELAY,
+                               delta=0.05)
+        # A worker that lived long enough resets the count.
+        command.quick_deaths = 3
+        with mock.patch('os.waitpid', return_value=(1, 1 << 8)):
+            command.workers[1] = time.monotonic() - serve.QUICK_DEATH - 1
+            command.reap()
+        self.assertEqual(command.quick_deaths, 0)
@@ -0,0 +1,70 @@
+import tempfile
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import caching, thumbnails
+from posts.models import Post
+from posts.tests.base_class import PostBaseTestClass
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), THUMBNAIL_WORKERS=1)
+class AsyncThumbnailTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(
+            text='With a picture.', author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+
+    def test_missing_thumbnail_is_queued_behind_a_placeholder(self):
+        with mock.patch('posts.thumbnails.queue') as queue:
+            content = self.guest_client.get(reverse('index')).content
+        self.assertIn(b'data:image/svg+xml', content)
+        queue.assert_called_once_with(
+            self.post.image.name, *thumbnails.POST_THUMBNAILS[0],
+            self.post.id)
+        thumbnails.render(*queue.call_args[0])
+        # The page takes the new card up once it is rebuilt.
+        with mock.patch('time.time',
+                        return_value=time.time() + caching.SOFT_TIMEOUT):
+            content = self.guest_client.get(reverse('index')).content
+        self.assertNotIn(b'data:image/svg+xml', content)
+        self.assertIn(b'/media/cache/', content)
+
+    def test_thumbnail_is_queued_once(self):
+        pool = mock.Mock()
+        with mock.patch('posts.thumbnails._get_pool', return_value=pool):
+            thumbnails.queue_post(self.post)
+            thumbnails.queue_post(self.post)
+        self.assertEqual(pool.submit.call_count, len(
+            thumbnails.POST_THUMBNAILS))
+        job = pool.submit.call_args[0]
+        job[0](*job[1:])
+        self.assertFalse(thumbnails._queued)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_without_workers_thumbnails_are_rendered_in_place(self):
+        content = self.guest_client.get(reverse('index')).content
+        self.assertNotIn(b'data:image/svg+xml', content)
+        self.assertIn(b'/media/cache/', content)
+
+    def test_rendering_refreshes_only_the_card(self):
+        before = caching.get_versions('global', f'post:{self.post.id}')
+        thumbnails.render(self.post.image.name, *thumbnails.POST_THUMBNAILS[0],
+                          self.post.id)
+        after = caching.get_versions('global', f'post:{self.post.id}')
+        self.assertEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
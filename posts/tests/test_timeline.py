@@ -0,0 +1,39 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Timeline
+from posts.tests.base_class import PostBaseTestClass
+
+
+class TimelineTest(PostBaseTestClass):
+
+    def follow_feed(self):
+        response = self.not_author.get(reverse('follow_index'))
+        return list(response.context.get('page'))
+
+    def test_follow_backfills_existing_posts(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        self.assertTrue(
+            Timeline.objects.filter(user=self.impostor,
+                                    post=self.post).exists())
+        self.assertEqual(self.follow_feed(), [self.post])
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        post = Post.objects.create(text='Fresh one.', author=self.user)
+        self.assertTrue(post.fanned_out)
+        self.assertEqual(self.follow_feed(), [post, self.post])
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        Follow.objects.get(user=self.impostor, author=self.user).delete()
+        self.assertFalse(Timeline.objects.filter(user=self.impostor).exists())
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        Follow.objects.create(user=self.impostor, author=self.user)
+        post = Post.objects.create(text='Too famous.', author=self.user)
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_feed(), [post, self.post])
@@ -1,6 +1,7 @@
 from django.urls import reverse
 from django.core.cache import cache
 
+from posts.models import User
 from posts.tests.base_class import PostBaseTestClass
 
 
@@ -18,6 +19,14 @@ class StaticURLTests(PostBaseTestClass):
                 response = self.guest_client.get(url)
                 self.assertEqual(response.status_code, 200)
 
+    def test_search_does_not_shadow_a_profile(self):
+        User.objects.create(username='search')
+        response = self.guest_client.get(
+            reverse('profile', kwargs={'username': 'search'}))
+        self.assertEqual(response.context['author'].username, 'search')
+        response = self.guest_client.get(reverse('search'), {'q': 'words'})
+        self.assertIn(self.post, response.context['page'])
+
     def test_url_new_is_unavailable_to_unauthorized_user(self):
         response = self.guest_client.get(reverse('new_post'))
         self.assertEqual(response.status_code, 302)
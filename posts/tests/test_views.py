@@ -1,12 +1,18 @@
 from django.core.paginator import Paginator
 from django.urls import reverse
+from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-from django.test import override_settings
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
 
+import re
 import tempfile
+import time
+from unittest import mock
 
-from posts.models import Follow
+from posts import caching, holes
+from posts.models import Comment, Follow, Post, User
 from posts.forms import PostForm
 from posts.tests.base_class import PostBaseTestClass
 
@@ -136,6 +142,9 @@ class PostsViewsTest(PostBaseTestClass):
 
     def test_cached_index_works_properly(self):
         page_before = self.authorized_client.get(reverse('index')).content
+        Post.objects.filter(id=self.post.id).update(text='Silently edited.')
+        page_cached = self.authorized_client.get(reverse('index')).content
+        self.assertEqual(page_before, page_cached)
         self.authorized_client.post(
             reverse('new_post'),
             data={
@@ -144,10 +153,26 @@ class PostsViewsTest(PostBaseTestClass):
             }
         )
         page_after = self.authorized_client.get(reverse('index')).content
-        self.assertEqual(page_before, page_after)
-        cache.clear()
-        page_after = self.authorized_client.get(reverse('index')).content
         self.assertNotEqual(page_before, page_after)
+        self.assertIn('Pathetic attempts'.encode(), page_after)
+
+    def test_writes_invalidate_cached_pages(self):
+        urls = [
+            reverse('group_posts', kwargs={'slug': 'testgroup'}),
+            reverse('post', kwargs={'username': 'testsubject',
+                                    'post_id': self.post.id}),
+        ]
+        for url in urls:
+            self.guest_client.get(url)
+        Comment.objects.create(post=self.post, author=self.impostor,
+                               text='Fresh comment from an impostor.')
+        self.post.text = 'Edited right now.'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.guest_client.get(url).content.decode()
+                self.assertIn('Edited right now.', content)
+                self.assertIn('Комментариев: 2', content)
 
     def test_user_can_subscribe_and_unsubscribe(self):
         follows_before = Follow.objects.count()
@@ -178,3 +203,251 @@ class PostsViewsTest(PostBaseTestClass):
         response2 = self.authorized_client.get(reverse('follow_index'))
         self.assertEqual(response1.context.get('page')[0].id, 2)
         self.assertEqual(response2.context.get('paginator').count, 0)
+
+
+class StaleWhileRevalidateTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('group_posts', kwargs={'slug': 'testgroup'})
+        self.guest_client.get(self.url)
+        Post.objects.filter(id=self.post.id).update(text='Quietly edited.')
+        # Only the post card learns about the edit, the page stays fresh.
+        caching.bump(f'post:{self.post.id}')
+
+    def later(self):
+        """Move the clock past the soft timeout of the cached page."""
+        return mock.patch('time.time', return_value=time.time() + 120)
+
+    def test_fresh_page_is_served_from_cache(self):
+        content = self.guest_client.get(self.url).content.decode()
+        self.assertNotIn('Quietly edited.', content)
+
+    def test_stale_page_is_rebuilt_by_one_request(self):
+        with self.later():
+            content = self.guest_client.get(self.url).content.decode()
+        self.assertIn('Quietly edited.', content)
+
+    def test_stale_page_is_served_while_rebuilding(self):
+        with self.later(), \
+                mock.patch.object(cache, 'add', return_value=False):
+            content = self.guest_client.get(self.url).content.decode()
+        self.assertNotIn('Quietly edited.', content)
+
+    def test_miss_waits_for_rebuild_then_renders(self):
+        Post.objects.create(text='Bumps the version.', author=self.user,
+                            group=self.group)
+        with mock.patch.object(cache, 'add', return_value=False), \
+                mock.patch('posts.caching.LOCK_WAIT', 0.1):
+            response = self.guest_client.get(self.url)
+        self.assertIn('Bumps the version.', response.content.decode())
+
+    def test_miss_polls_the_lock_without_writes(self):
+        Post.objects.create(text='Bumps the version.', author=self.user,
+                            group=self.group)
+        add = cache.add
+        locks = []
+
+        def taken(key, *args):
+            # Another request takes the lock first and keeps it.
+            if key.startswith('lock:'):
+                locks.append(key)
+                add(key, *args)
+                return False
+            return add(key, *args)
+
+        with mock.patch.object(cache, 'add', side_effect=taken), \
+                mock.patch('posts.caching.LOCK_WAIT', 0.3):
+            response = self.guest_client.get(self.url)
+        self.assertIn('Bumps the version.', response.content.decode())
+        self.assertEqual(len(locks), 1)
+
+    def test_slow_rebuild_keeps_the_lock_taken_since(self):
+        add = cache.add
+        locks = []
+
+        def take(key, *args):
+            if key.startswith('lock:'):
+                locks.append(key)
+            return add(key, *args)
+
+        def slow(*args):
+            # The lock expired meanwhile and another request took it.
+            cache.set(locks[0], 'another request')
+            return render(*args)
+
+        render = caching._render
+        with self.later(), \
+                mock.patch.object(cache, 'add', side_effect=take), \
+                mock.patch('posts.caching._render', side_effect=slow):
+            self.guest_client.get(self.url)
+        self.assertEqual(cache.get(locks[0]), 'another request')
+
+    def test_responses_setting_cookies_are_not_cached(self):
+        request = RequestFactory().get(self.url)
+        response = HttpResponse()
+        self.assertTrue(caching._cacheable(request, response))
+        response.set_cookie('messages', 'Saved.')
+        self.assertFalse(caching._cacheable(request, response))
+
+
+class PostCardCacheTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Post.objects.create(text='Another post.',
+                                         author=self.impostor)
+
+    def rendered_cards(self, url):
+        response = self.guest_client.get(url)
+        return [template.name for template in response.templates
+                ].count('includes/post_item.html')
+
+    def test_edit_rerenders_only_the_edited_card(self):
+        self.assertEqual(self.rendered_cards(reverse('index')), 2)
+        self.other.text = 'Another post, edited.'
+        self.other.save()
+        self.assertEqual(self.rendered_cards(reverse('index')), 1)
+        content = self.guest_client.get(reverse('index')).content.decode()
+        self.assertIn('Another post, edited.', content)
+
+    def test_cards_are_shared_between_pages(self):
+        self.rendered_cards(reverse('index'))
+        url = reverse('profile', kwargs={'username': 'testsubject'})
+        self.assertEqual(self.rendered_cards(url), 0)
+
+    def test_edit_button_is_only_on_the_authors_card(self):
+        edit_url = reverse('post_edit', kwargs={'username': 'testsubject',
+                                                'post_id': self.post.id})
+        guest = self.guest_client.get(reverse('index')).content.decode()
+        author = self.authorized_client.get(
+            reverse('index')).content.decode()
+        self.assertNotIn(edit_url, guest)
+        self.assertIn(edit_url, author)
+
+    def test_rename_rerenders_the_authors_cards(self):
+        self.rendered_cards(reverse('index'))
+        self.impostor.username = 'renamed'
+        self.impostor.save()
+        self.assertEqual(self.rendered_cards(reverse('index')), 1)
+        content = self.guest_client.get(reverse('index')).content.decode()
+        self.assertIn('@renamed', content)
+
+    def test_login_keeps_cached_cards(self):
+        self.rendered_cards(reverse('index'))
+        self.impostor.last_login = timezone.now()
+        self.impostor.save(update_fields=['last_login'])
+        self.assertEqual(self.rendered_cards(reverse('index')), 0)
+
+
+class ProfileCacheTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('profile', kwargs={'username': 'testsubject'})
+
+    def content(self, client, **params):
+        return client.get(self.url, params).content.decode()
+
+    def test_feed_is_cached_per_author(self):
+        Post.objects.create(text='Impostor writes.', author=self.impostor)
+        self.content(self.guest_client)
+        other = self.guest_client.get(
+            reverse('profile', kwargs={'username': 'impostor'}))
+        self.assertIn('Impostor writes.', other.content.decode())
+        self.assertNotIn('Impostor writes.', self.content(self.guest_client))
+
+    def test_feed_is_cached_per_page(self):
+        Post.objects.bulk_create(
+            Post(text=f'Filler {i}', author=self.user) for i in range(10))
+        first = self.content(self.guest_client)
+        second = self.content(self.guest_client, page=2)
+        self.assertNotEqual(first, second)
+        self.assertIn('Just a meaningless set of words.', second)
+
+    def test_authors_posts_invalidate_the_feed(self):
+        self.content(self.guest_client)
+        Post.objects.create(text='Brand new post.', author=self.user)
+        self.assertIn('Brand new post.', self.content(self.guest_client))
+
+    def test_repeat_visit_only_looks_the_author_up(self):
+        self.content(self.guest_client)
+        with self.assertNumQueries(1):
+            self.content(self.guest_client)
+
+    def test_freed_username_does_not_get_the_old_page(self):
+        self.assertIn('Just a meaningless', self.content(self.guest_client))
+        self.user.delete()
+        User.objects.create(username='testsubject')
+        self.assertNotIn('Just a meaningless',
+                         self.content(self.guest_client))
+
+    def test_follow_button_is_not_cached(self):
+        self.content(self.authorized_client)
+        self.assertNotIn('Подписаться', self.content(self.guest_client))
+        self.assertIn('Подписаться', self.content(self.not_author))
+        self.assertNotIn('Подписаться', self.content(self.authorized_client))
+        Follow.objects.create(user=self.impostor, author=self.user)
+        self.assertIn('Отписаться', self.content(self.not_author))
+
+
+class HolePunchingTest(PostBaseTestClass):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('post', kwargs={'username': 'testsubject',
+                                           'post_id': self.post.id})
+        self.edit_url = reverse('post_edit', kwargs={
+            'username': 'testsubject', 'post_id': self.post.id})
+
+    def test_page_is_cached_once_for_every_viewer(self):
+        response = self.guest_client.get(self.url)
+        self.assertTemplateUsed(response, 'post.html')
+        for client in (self.authorized_client, self.not_author):
+            with self.subTest(client=client):
+                response = client.get(self.url)
+                self.assertTemplateNotUsed(response, 'post.html')
+
+    def test_holes_are_filled_per_viewer(self):
+        guest = self.guest_client.get(self.url).content.decode()
+        author = self.authorized_client.get(self.url).content.decode()
+        other = self.not_author.get(self.url).content.decode()
+        self.assertNotIn('<!--hole:', guest + author + other)
+        self.assertIn('Пользователь: testsubject.', author)
+        self.assertIn('Пользователь: impostor.', other)
+        self.assertIn(self.edit_url, author)
+        self.assertNotIn(self.edit_url, guest + other)
+        self.assertNotIn('csrfmiddlewaretoken', guest)
+        self.assertIn('csrfmiddlewaretoken', other)
+
+    def test_only_markers_of_known_holes_are_filled(self):
+        request = RequestFactory().get(self.url)
+        request.user = self.user
+        forged = ['<!--hole:nav-->',
+                  f'<!--hole:{holes.NONCE}:nonexistent:1-->']
+        for content in forged:
+            with self.subTest(content=content):
+                self.assertEqual(holes.fill(request, content), content)
+        self.assertIn('testsubject',
+                      holes.fill(request, holes.marker('nav')))
+
+    def test_markers_in_user_text_are_not_filled(self):
+        self.post.text = 'Look: <!--hole:nav-->'
+        self.post.save()
+        content = self.not_author.get(self.url).content.decode()
+        self.assertEqual(content.count('Пользователь: impostor.'), 1)
+
+    def test_comment_form_token_is_accepted(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.impostor)
+        self.guest_client.get(self.url)
+        content = client.get(self.url).content.decode()
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"', content).group(1)
+        client.post(
+            reverse('add_comment', kwargs={'username': 'testsubject',
+                                           'post_id': self.post.id}),
+            {'text': 'Through a punched hole.',
+             'csrfmiddlewaretoken': token})
+        self.assertTrue(
+            Comment.objects.filter(text='Through a punched hole.').exists())
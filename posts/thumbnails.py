@@ -0,0 +1,134 @@
+"""Thumbnails are rendered by a pool of background threads, not requests.
+
+``AsyncThumbnailBackend`` (``THUMBNAIL_BACKEND``) only looks a thumbnail
+up in sorl's key-value store. A missing one is queued for the pool and a
+placeholder of the same size is returned; once the thumbnail is written,
+only the post's own scope is bumped, so its card is re-rendered and the
+pages holding the placeholder take it up when they are next rebuilt.
+New images are queued as soon as the post is committed, so most
+thumbnails exist before the first view.
+With ``THUMBNAIL_WORKERS = 0`` thumbnails are rendered in place.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from posts import caching
+from posts.models import Post
+
+# Every thumbnail of a post image, as in includes/post_item.html.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_queued = set()
+
+
+class Placeholder(DummyImageFile):
+    """A blank image of the thumbnail size, shown until it is rendered."""
+
+    @property
+    def url(self):
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.x}" '
+            f'height="{self.y}"><rect width="100%" height="100%" '
+            f'fill="#e9ecef"/></svg>'
+        )
+        return 'data:image/svg+xml,' + quote(svg)
+
+
+class AsyncThumbnailBackend(ThumbnailBackend):
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        rendering = getattr(_local, 'rendering', False)
+        if rendering or not settings.THUMBNAIL_WORKERS:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        thumbnail = self.lookup(file_, geometry_string, options)
+        if thumbnail:
+            return thumbnail
+        instance = getattr(file_, 'instance', None)
+        queue(getattr(file_, 'name', file_), geometry_string, options,
+              instance.pk if isinstance(instance, Post) else None)
+        return Placeholder(geometry_string)
+
+    def lookup(self, file_, geometry_string, options):
+        """Return the stored thumbnail or None, the way sorl names it."""
+        source = ImageFile(file_)
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    # A forked worker process gets a pool of its own.
+    if _pool_pid != os.getpid():
+        _pool = ThreadPoolExecutor(settings.THUMBNAIL_WORKERS,
+                                   thread_name_prefix='thumbnails')
+        _pool_pid = os.getpid()
+        _queued.clear()
+    return _pool
+
+
+def render(name, geometry_string, options, post_id=None):
+    """Render one thumbnail and refresh the card of its post."""
+    _local.rendering = True
+    try:
+        default.backend.get_thumbnail(name, geometry_string, **options)
+        if post_id:
+            caching.bump(f'post:{post_id}')
+    except Exception:
+        logger.exception('Cannot render thumbnail %s of %s.',
+                         geometry_string, name)
+    finally:
+        _local.rendering = False
+
+
+def _render_queued(job, *args):
+    try:
+        render(*args)
+    finally:
+        with _lock:
+            _queued.discard(job)
+
+
+def queue(name, geometry_string, options, post_id=None):
+    """Render the thumbnail in the background, once however often asked."""
+    if not settings.THUMBNAIL_WORKERS:
+        render(name, geometry_string, options, post_id)
+        return
+    job = (name, geometry_string, tuple(sorted(options.items())), post_id)
+    with _lock:
+        if job in _queued:
+            return
+        pool = _get_pool()
+        _queued.add(job)
+    pool.submit(_render_queued, job, name, geometry_string, options, post_id)
+
+
+def queue_post(post):
+    """Queue every thumbnail of the post image."""
+    for geometry_string, options in POST_THUMBNAILS:
+        queue(post.image.name, geometry_string, options, post.pk)
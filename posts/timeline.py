@@ -0,0 +1,88 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from posts.models import Follow, Post, Timeline, UserStats
+
+BATCH_SIZE = 500
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def should_fan_out(author_id):
+    """Tell whether new posts of the author are pushed to followers."""
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    return (followers or 0) <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def fan_out(post):
+    """Push a freshly published post into every follower's timeline."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(
+        Timeline(user_id=user_id, post_id=post.id,
+                 author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Copy the author's pushed posts into a new follower's timeline."""
+    posts = Post.objects.filter(
+        author_id=author_id, fanned_out=True).values_list('id', 'pub_date')
+    _bulk_insert(
+        Timeline(user_id=user_id, post_id=post_id,
+                 author_id=author_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Drop the author's posts from a former follower's timeline."""
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Refill every timeline from the follows and the pushed posts.
+
+    For rows written around the signals, e.g. with ``bulk_create``.
+    """
+    Timeline.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Timeline._meta.db_table} '
+            f'(user_id, post_id, author_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {Post._meta.db_table} post '
+            f'INNER JOIN {Follow._meta.db_table} follow '
+            f'ON follow.author_id = post.author_id '
+            f'WHERE post.fanned_out = %s '
+            # In index order, so every index is appended to.
+            f'ORDER BY follow.user_id, post.pub_date, post.id', [True])
+
+
+def feed_sources(user):
+    """Return keyset sources of the user's follow feed.
+
+    Pushed posts are a single range read over the user's timeline,
+    posts of popular authors are pulled from the posts table on read.
+    """
+    return [
+        (Post.objects.filter(timeline__user=user).annotate(
+            feed_date=F('timeline__pub_date'), feed_id=F('timeline__post')),
+         ('feed_date', 'feed_id')),
+        (Post.objects.filter(
+            fanned_out=False,
+            author__in=user.follower.values('author')),
+         ('pub_date', 'id')),
+    ]
@@ -14,6 +14,9 @@ urlpatterns = [
     path("<str:username>/unfollow/", views.profile_unfollow,
          name="profile_unfollow"),
     path('<str:username>/', views.profile, name='profile'),
+    # Profiles only have numbers, follow and unfollow below them, so no
+    # username can take this path.
+    path('posts/search/', views.search, name='search'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
@@ -1,20 +1,22 @@
+from urllib.parse import urlencode
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.cache import cache_page
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 
 from posts.models import User, Group, Post, Follow
+from posts.caching import cache_page_versioned
 from posts.forms import PostForm, CommentForm
+from posts.paginator import paginate
+from posts.search import paginate as paginate_search
+from posts.timeline import feed_sources
+from yatube import write_queue
 
 
-@cache_page(5, key_prefix='index_page')
+@cache_page_versioned('global', key_prefix='index_page')
 def index(request):
     """Render the homepage."""
-    post_list = Post.objects.prefetch_related(
-        'author', 'group', 'comments').all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'index.html',
@@ -22,22 +24,19 @@ def index(request):
     )
 
 
-@cache_page(5, key_prefix='groups_page')
+@cache_page_versioned('groups', key_prefix='groups_page')
 def group_list(request):
     """Render the page with a list of groups."""
     groups = Group.objects.order_by('-title')
     return render(request, 'group_list.html', {'groups': groups})
 
 
-@cache_page(5, key_prefix='group_page')
+@cache_page_versioned('group:{slug}', key_prefix='group_page')
 def group_posts(request, slug):
     """Render the page with a list of group's posts."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.prefetch_related(
-        'author', 'group', 'comments').all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = group.posts.feed()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'group.html',
@@ -45,6 +44,19 @@ def group_posts(request, slug):
     )
 
 
+@cache_page_versioned('global', key_prefix='search_page')
+def search(request):
+    """Render the page with posts matching the search query."""
+    query = request.GET.get('q', '').strip()
+    paginator, page = paginate_search(request, query)
+    return render(
+        request,
+        'search.html',
+        {'query': query, 'params': urlencode({'q': query}),
+         'page': page, 'paginator': paginator}
+    )
+
+
 @login_required
 def new_post(request):
     """Render the page with a form of creating a new post."""
@@ -52,34 +64,52 @@ def new_post(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # The image is written to storage here, so the writer thread holds
+        # the database lock only for the insert.
+        image = Post._meta.get_field('image').pre_save(post, add=True)
+        try:
+            write_queue.run(post.save)
+        except Exception:
+            if image:
+                image.delete(save=False)
+            raise
         return redirect('index')
     return render(request, 'new_post.html', {'form': form})
 
 
 def profile(request, username):
     """Render the profile page."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.prefetch_related(
-        'author', 'group', 'comments').all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    return _profile(request, author=author)
+
+
+# Keyed on the author's id, a new user taking a freed username does not
+# get the pages of the old one.
+@cache_page_versioned('author:{author.pk}', key_prefix='profile_page')
+def _profile(request, author):
+    post_list = author.posts.feed()
+    paginator, page = paginate(request, post_list)
+    # The page is shared by every viewer, the follow button is a hole.
     return render(
         request, 'profile.html',
-        {'author': author, 'page': page,
-         'paginator': paginator, 'following': following}
+        {'author': author, 'page': page, 'paginator': paginator}
     )
 
 
-@cache_page(5, key_prefix='post_page')
 def post_view(request, username, post_id):
     """Render the page containing one specific post with comments."""
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    comments = post.comments.prefetch_related('author').all()
+    author_id = get_object_or_404(
+        Post.objects.values_list('author_id', flat=True),
+        author__username=username, id=post_id)
+    return _post_view(request, post_id=post_id, author_id=author_id)
+
+
+@cache_page_versioned('post:{post_id}', 'author:{author_id}',
+                      key_prefix='post_page')
+def _post_view(request, post_id, author_id):
+    post = get_object_or_404(Post.objects.feed(with_stats=True), id=post_id)
+    comments = post.comments.select_related('author').all()
     form = CommentForm()
     return render(
         request, 'post.html',
@@ -109,52 +139,66 @@ def post_edit(request, username, post_id):
     return redirect('post', username=username, post_id=post_id)
 
 
+def _save_comment(form, author, username, post_id):
+    post = get_object_or_404(Post, author__username=username, id=post_id)
+    comment = form.save(commit=False)
+    comment.post = post
+    comment.author = author
+    comment.save()
+    return comment
+
+
 @login_required
 def add_comment(request, username, post_id):
     """Render the comment page."""
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        post = get_object_or_404(Post, author__username=username, id=post_id)
-        comment = form.save(commit=False)
-        comment.post = post
-        comment.author = request.user
-        comment.save()
+        write_queue.run(_save_comment, form, request.user, username,
+                        post_id)
     return redirect('post', username=username, post_id=post_id)
 
 
 @login_required
-@cache_page(40, key_prefix='follow_page')
+@cache_page_versioned('global', 'follower:{user.pk}',
+                      key_prefix='follow_page')
 def follow_index(request):
     """Render the page with followed's latest posts."""
-    post_list = Post.objects.prefetch_related(
-        'author', 'group', 'comments').filter(
-            author__in=request.user.follower.all().values('author'))
-    message = len(post_list) == 0
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    sources = [
+        (post_list.feed(), keys)
+        for post_list, keys in feed_sources(request.user)
+    ]
+    paginator, page = paginate(request, sources)
+    message = not page.object_list
     return render(
         request, "follow.html",
         {'page': page, 'paginator': paginator, 'message': message}
     )
 
 
+def _follow(user, username):
+    author = get_object_or_404(User, username=username)
+    return Follow.objects.get_or_create(user=user, author=author)
+
+
+def _unfollow(user, username):
+    return get_object_or_404(
+        Follow, user=user, author__username=username).delete()
+
+
 @login_required
 def profile_follow(request, username):
     """Allow the user to subscribe if the user is not subscribed already
     and don't allow self-subscription.
     """
     if request.user.username != username:
-        author = get_object_or_404(User, username=username)
-        Follow.objects.get_or_create(user=request.user, author=author)
+        write_queue.run(_follow, request.user, username)
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     """Allow the user to unsubscribe."""
-    get_object_or_404(
-        Follow, user=request.user, author__username=username).delete()
+    write_queue.run(_unfollow, request.user, username)
     return redirect('profile', username=username)
 
 
@@ -0,0 +1,15 @@
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from yatube.threaded_asgi import ThreadedASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = ThreadedASGIHandler(get_wsgi_application(),
+                                  settings.ASGI_THREADS)
+
+# Read the static files manifest now instead of on the first request.
+from django.contrib.staticfiles.storage import staticfiles_storage  # noqa
+staticfiles_storage.hashed_files
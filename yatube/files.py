@@ -0,0 +1,194 @@
+"""Serving of media and static files without tying up the worker.
+
+``serve`` replaces ``django.views.static.serve`` when DEBUG is off. It
+answers If-None-Match / If-Modified-Since with 304 and a single byte
+range with 206, both from one ``stat()``. File bodies are returned as a
+``FileResponse``, which WSGI servers with ``wsgi.file_wrapper`` (gunicorn,
+uWSGI) send with zero-copy ``sendfile``. With ``SENDFILE_MODE`` the body
+is not sent by Django at all but handed off to the front proxy:
+
+``'nginx'``
+    ``X-Accel-Redirect`` to ``accel_prefix`` + the percent-encoded path,
+    which nginx decodes and serves from an ``internal`` location::
+
+        location /internal/media/ { internal; alias /srv/yatube/media/; }
+
+``'apache'``
+    ``X-Sendfile`` with the percent-encoded bytes of the absolute path,
+    for mod_xsendfile with ``XSendFileUnescape On`` (its default).
+
+Headers only carry ASCII, so unquoted names like ``фото 1.jpg`` would
+reach the proxy MIME-encoded and not be found.
+
+``serve_static`` serves collected static files: the ``.br`` or ``.gz``
+sibling written by ``yatube.storage`` when the client accepts it, and
+content-hashed names as immutable.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASHED = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Precompressed siblings in the order of preference.
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+# Compressed files are served as such, browsers must not unpack them.
+ENCODED_TYPES = {
+    'gzip': 'application/gzip',
+    'br': 'application/x-brotli',
+    'bzip2': 'application/x-bzip',
+    'xz': 'application/x-xz',
+}
+
+
+def _stat(document_root, path):
+    try:
+        fullpath = safe_join(document_root, path)
+        stats = os.stat(fullpath)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404('Файл не найден.')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('Файл не найден.')
+    return fullpath, stats
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and not params[2:].strip('0.'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag(stats):
+    return f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+
+
+def _byte_range(request, size, etag, last_modified):
+    """Return the requested ``(start, end)`` or None for the whole file.
+
+    Only a single range is honoured; multiple ranges and ranges failing
+    If-Range get the whole file, which RFC 7233 allows. An unsatisfiable
+    range returns ``(size, size)``.
+    """
+    match = RANGE.match(request.META.get('HTTP_RANGE', '').strip())
+    if match is None or request.method != 'GET':
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and (
+            parse_http_date_safe(if_range) != last_modified):
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return size, size
+    return start, end
+
+
+def serve(request, path, document_root, accel_prefix=None,
+          cache_control=None, precompressed=False):
+    """Serve ``path`` from ``document_root``, see the module docstring."""
+    fullpath, stats = _stat(document_root, path)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = ENCODED_TYPES.get(
+        encoding, content_type or 'application/octet-stream')
+    content_encoding = None
+    if precompressed:
+        accepted = _accepted_encodings(request)
+        for coding, suffix in PRECOMPRESSED:
+            if coding in accepted:
+                try:
+                    fullpath, stats = _stat(document_root, path + suffix)
+                except Http404:
+                    continue
+                path, content_encoding = path + suffix, coding
+                break
+    size = stats.st_size
+    last_modified = int(stats.st_mtime)
+    etag = _etag(stats)
+
+    response = HttpResponse()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    if precompressed:
+        response['Vary'] = 'Accept-Encoding'
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response)
+    if conditional is not response:
+        return conditional
+
+    response['Content-Type'] = content_type
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    if settings.SENDFILE_MODE == 'nginx':
+        # nginx answers ranges and sets the length itself.
+        response['X-Accel-Redirect'] = accel_prefix + quote(path)
+        return response
+    if settings.SENDFILE_MODE == 'apache':
+        response['X-Sendfile'] = quote(os.fsencode(fullpath))
+        return response
+    if request.method == 'HEAD':
+        response['Content-Length'] = str(size)
+        return response
+
+    byte_range = _byte_range(request, size, etag, last_modified)
+    if byte_range == (size, size):
+        response.status_code = 416
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    start, end = byte_range or (0, size - 1)
+    file = open(fullpath, 'rb')
+    file.seek(start)
+    # Only a body running to the end of the file can go through sendfile.
+    streamed = FileResponse(
+        file if end == size - 1 else _limited(file, end - start + 1))
+    if byte_range is not None:
+        streamed.status_code = 206
+        streamed['Content-Range'] = f'bytes {start}-{end}/{size}'
+    for header, value in response.items():
+        streamed[header] = value
+    streamed['Content-Length'] = str(end - start + 1)
+    return streamed
+
+
+def serve_static(request, path, accel_prefix=None):
+    """Serve a collected static file, precompressed when possible."""
+    return serve(
+        request, path, settings.STATIC_ROOT, accel_prefix=accel_prefix,
+        cache_control=IMMUTABLE if HASHED.search(path) else None,
+        precompressed=True)
+
+
+def _limited(file, length, block_size=FileResponse.block_size):
+    """Yield ``length`` bytes of ``file`` from its current position."""
+    try:
+        while length > 0:
+            chunk = file.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
@@ -18,6 +18,8 @@ DEBUG = int(os.getenv('DJANGO_DEBUG'))
 
 ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS').split()
 
+TEST_RUNNER = 'yatube.testing.TestRunner'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -25,7 +27,6 @@ INSTALLED_APPS = [
     'users',
     'about',
     'sorl.thumbnail',
-    'debug_toolbar',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -35,7 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'yatube.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,14 +44,38 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.holes.HoleMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Send SQL, cache and template timings of every response in a
+# Server-Timing header and log them, see yatube/timing.py.
+SERVER_TIMING = bool(int(os.getenv('DJANGO_SERVER_TIMING', 0)))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,25 +90,66 @@ TEMPLATES = [
     },
 ]
 
+# One SQLite file shared by every worker process on the node. Test runs
+# get an empty file of their own, see yatube/testing.py.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.sqlite_cache.SQLiteCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
 
+# Authors with more followers than this are not fanned out on write,
+# their posts are pulled into the follow feed on read instead.
+TIMELINE_FANOUT_LIMIT = 1000
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# WAL lets readers run next to the single writer, write transactions
+# (yatube.write_queue) queue for the lock at BEGIN for up to busy_timeout
+# milliseconds, and each worker thread keeps its connection for
+# CONN_MAX_AGE seconds.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'yatube.sqlite_db',
+        'NAME': os.getenv('DJANGO_DATABASE_NAME',
+                          os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': 10,
+            'pragmas': {
+                'journal_mode': 'WAL',
+                # Durable across crashes of the app, may lose the last
+                # transactions on power loss.
+                'synchronous': 'NORMAL',
+                'busy_timeout': 10000,
+                'cache_size': -64 * 1024,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
+# Views served through yatube/asgi.py run in this many threads per
+# process, the event loop keeps the client connections.
+ASGI_THREADS = int(os.getenv('DJANGO_ASGI_THREADS', 32))
+
+# Writes of concurrent requests are committed together: up to this many
+# per transaction, waiting at most this many seconds for the batch to
+# fill up. 0 commits every write on its own.
+WRITE_BATCH_SIZE = int(os.getenv('DJANGO_WRITE_BATCH_SIZE', 32))
+WRITE_BATCH_DELAY = float(os.getenv('DJANGO_WRITE_BATCH_DELAY', 0.002))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -140,6 +206,33 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'posts/static/'),
 )
+# collectstatic writes hashed names, a manifest and .gz/.br siblings.
+STATICFILES_STORAGE = 'yatube.storage.CompressedManifestStorage'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.getenv('DJANGO_MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Thumbnails are rendered by this many background threads per process,
+# pages show a placeholder meanwhile; 0, the default, renders them inside
+# the request. Deployments turn the pool on, see the Dockerfile.
+THUMBNAIL_BACKEND = 'posts.thumbnails.AsyncThumbnailBackend'
+THUMBNAIL_WORKERS = int(os.getenv('DJANGO_THUMBNAIL_WORKERS', 0))
+
+# Uploads above this size are streamed to a temporary file in chunks, the
+# request is cut off once a file passes IMAGE_MAX_UPLOAD_SIZE.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'posts.images.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Post images: the upload and header limits, originals are downscaled to
+# IMAGE_MAX_SIDE and no decode may take more than IMAGE_MAX_DECODE_MEMORY.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+IMAGE_MAX_SIDE = 2048
+IMAGE_MAX_DECODE_MEMORY = 64 * 1024 * 1024
+
+# Media and static files are handed off to the front proxy when this is
+# 'nginx' (X-Accel-Redirect) or 'apache' (X-Sendfile), see yatube/files.py.
+SENDFILE_MODE = os.getenv('DJANGO_SENDFILE_MODE', '')
@@ -0,0 +1,238 @@
+"""Cache backend shared by every worker process on one node.
+
+Entries live in a single SQLite file opened in WAL mode, so readers never
+block each other or the writer. Each entry records its size and last
+access time; triggers keep running totals, and once ``MAX_SIZE`` bytes or
+``MAX_ENTRIES`` entries are exceeded the expired and then the least
+recently used entries are evicted.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.sqlite_cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_SIZE': 64 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from yatube import timing
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_totals SET entries = entries + 1, size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_totals SET entries = entries - 1, size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_totals SET size = size - old.size + new.size;
+END;
+'''
+# Reads refresh the LRU timestamp at most this often (in seconds), so a
+# hot key does not turn every read into a write.
+ACCESS_RESOLUTION = 5
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Connections are per thread and are never inherited by a fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=30,
+                                 isolation_level=None,
+                                 check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _fetch(self, keys):
+        started = time.perf_counter()
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        rows = self._db.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', keys,
+        ).fetchall()
+        found, stale, touched = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                stale.append((key, now))
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > ACCESS_RESOLUTION:
+                touched.append((now, key))
+        if stale or touched:
+            with self._transaction() as db:
+                # A set made since the read must survive.
+                db.executemany(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    stale)
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', touched)
+        timing.cache_read(len(keys), len(found), started)
+        return found
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def _store(self, items, timeout, only_new=False):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        verb = 'INSERT OR IGNORE' if only_new else 'INSERT OR REPLACE'
+        rows = []
+        for key, value in items:
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            rows.append((key, blob, expires, now, len(blob)))
+        with self._transaction() as db:
+            if only_new:
+                db.executemany(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    [(row[0], now) for row in rows])
+            before = db.total_changes
+            db.executemany(
+                f'{verb} INTO cache (key, value, expires, accessed, size) '
+                f'VALUES (?, ?, ?, ?, ?)', rows)
+            stored = db.total_changes != before
+            self._cull(db, now)
+        return stored
+
+    def _cull(self, db, now):
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_totals').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        while True:
+            entries, size = db.execute(
+                'SELECT entries, size FROM cache_totals').fetchone()
+            if entries <= self._max_entries and size <= self._max_size:
+                return
+            # Drop a 1/CULL_FREQUENCY slice of the oldest entries at once.
+            batch = max(entries // self._cull_frequency, 1)
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)', (batch,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store([(key, value)], timeout, only_new=True)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store([(key, value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._transaction() as db:
+            cursor = db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND '
+                '(expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key in self._fetch([key])
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        return {
+            made[key]: value
+            for key, value in self._fetch(list(made)).items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        if items:
+            self._store(items, timeout)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        with self._transaction() as db:
+            db.executemany('DELETE FROM cache WHERE key = ?',
+                           [(key,) for key in keys])
+
+    def clear(self):
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are kept open across requests on purpose.
+        pass
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` around a block of writes."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
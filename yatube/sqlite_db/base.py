@@ -0,0 +1,59 @@
+"""SQLite backend tuned for several worker processes on one database.
+
+Two options are read from ``DATABASES['default']['OPTIONS']`` on top of
+the ones ``sqlite3.connect`` takes:
+
+``pragmas``
+    ``PRAGMA`` statements run on every new connection, in order, e.g.
+    ``journal_mode=WAL`` so readers and the writer never block each
+    other, and ``busy_timeout`` so a writer waits for the lock instead
+    of failing at once.
+
+``transaction_mode``
+    How ``atomic()`` blocks begin: ``'DEFERRED'`` (the default),
+    ``'IMMEDIATE'`` or ``'EXCLUSIVE'``. A deferred transaction that
+    reads and then writes cannot wait for the write lock, SQLite fails
+    it with "database is locked" straight away, while an immediate one
+    queues for the lock at BEGIN under ``busy_timeout``. An immediate
+    transaction also queues when it only reads, so the site keeps the
+    default and its write paths ask for ``connection.immediate()``.
+"""
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop(
+            'transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode must be one of {TRANSACTION_MODES}.')
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    @contextmanager
+    def immediate(self):
+        """Begin the transactions opened in the block with IMMEDIATE."""
+        immediate, self._immediate = self._immediate, True
+        try:
+            yield
+        finally:
+            self._immediate = immediate
+
+    def _start_transaction_under_autocommit(self):
+        mode = 'IMMEDIATE' if self._immediate else self.transaction_mode
+        self.cursor().execute(f'BEGIN {mode}')
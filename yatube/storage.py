@@ -0,0 +1,60 @@
+"""Static files storage writing hashed, precompressed files.
+
+``collectstatic`` stores every file under a content-hashed name listed in
+``staticfiles.json`` (``ManifestStaticFilesStorage``), and next to each
+hashed text asset a ``.gz`` and, when Brotli is installed, a ``.br``
+sibling. ``yatube.files.serve_static`` picks the variant the client
+accepts and marks hashed names immutable. The manifest is read once when
+the storage is created, see ``yatube/wsgi.py``.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html',
+                '.xml', '.ico', '.ttf', '.otf', '.eot')
+# Smaller files, or ones that do not shrink by a tenth, are kept plain.
+MIN_SIZE = 256
+MIN_RATIO = 0.9
+
+
+def compress(data):
+    """Yield ``(suffix, compressed data)`` for every available encoding."""
+    yield '.gz', gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(data, quality=11)
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE):
+                self._compress(name)
+
+    def _compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < MIN_SIZE:
+            return
+        for suffix, compressed in compress(data):
+            if len(compressed) < len(data) * MIN_RATIO:
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected yet (development, tests): use the source name.
+            return name
@@ -0,0 +1,42 @@
+"""Test runs start with an empty cache of their own.
+
+The cache outlives the test database, so pages and version tokens left
+by an earlier run, or by the development server, would be served for
+rows that no longer exist. ``TestRunner`` (``TEST_RUNNER``) and the
+pytest fixture in ``conftest.py`` point the default cache at a new file
+for the whole run and remove it afterwards.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+@contextmanager
+def cold_cache():
+    """Use an empty cache file in a temporary directory."""
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    default = dict(settings.CACHES['default'],
+                   LOCATION=os.path.join(directory, 'cache.sqlite3'))
+    try:
+        with override_settings(CACHES={**settings.CACHES,
+                                       'default': default}):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cold_cache = cold_cache()
+        self._cold_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cold_cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,131 @@
+import os
+import tempfile
+from urllib.parse import unquote
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from yatube.files import serve
+
+CONTENT = bytes(range(256)) * 40
+
+
+@override_settings(SENDFILE_MODE='')
+class ServeTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, 'posts'))
+        with open(os.path.join(self.directory.name, 'posts', 'a.jpg'),
+                  'wb') as file:
+            file.write(CONTENT)
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get(self, path='posts/a.jpg', method='get', **headers):
+        request = getattr(self.factory, method)('/media/' + path, **headers)
+        return serve(request, path, self.directory.name,
+                     accel_prefix='/internal/media/')
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIsNotNone(response.file_to_stream)
+        self.assertEqual(self.body(response), CONTENT)
+
+    def test_conditional_requests(self):
+        response = self.get()
+        response.close()
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']},
+                        {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}):
+            with self.subTest(headers=headers):
+                cached = self.get(**headers)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(
+            self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_byte_ranges(self):
+        size = len(CONTENT)
+        cases = {
+            'bytes=10-19': (10, 19),
+            'bytes=10-': (10, size - 1),
+            'bytes=-10': (size - 10, size - 1),
+            'bytes=10-99999': (10, size - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'],
+                                 f'bytes {start}-{end}/{size}')
+                self.assertEqual(response['Content-Length'],
+                                 str(end - start + 1))
+                self.assertEqual(self.body(response),
+                                 CONTENT[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'],
+                         f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        response = self.get(HTTP_RANGE='bytes=0-9',
+                            HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_head(self):
+        response = self.get(method='head')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response.content, b'')
+
+    def test_missing_files_and_directories(self):
+        for path in ('posts/missing.jpg', 'posts', '../etc/passwd'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+    def test_proxy_handoff(self):
+        with self.settings(SENDFILE_MODE='nginx'):
+            response = self.get()
+            self.assertEqual(response['X-Accel-Redirect'],
+                             '/internal/media/posts/a.jpg')
+        with self.settings(SENDFILE_MODE='apache'):
+            response = self.get()
+            self.assertEqual(
+                response['X-Sendfile'],
+                os.path.join(self.directory.name, 'posts', 'a.jpg'))
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    def test_proxy_handoff_quotes_non_ascii_names(self):
+        with open(os.path.join(self.directory.name, 'posts', 'фото 1.jpg'),
+                  'wb') as file:
+            file.write(CONTENT)
+        with self.settings(SENDFILE_MODE='nginx'):
+            response = self.get('posts/фото 1.jpg')
+            self.assertEqual(
+                response['X-Accel-Redirect'],
+                '/internal/media/posts/%D1%84%D0%BE%D1%82%D0%BE%201.jpg')
+        with self.settings(SENDFILE_MODE='apache'):
+            response = self.get('posts/фото 1.jpg')
+            self.assertEqual(
+                unquote(response['X-Sendfile']),
+                os.path.join(self.directory.name, 'posts', 'фото 1.jpg'))
+            self.assertTrue(response['X-Sendfile'].isascii())
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from yatube.sqlite_cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.assertTrue(self.cache.add('key', {'a': 1}))
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.cache.set_many({'one': 1, 'two': 2})
+        self.assertEqual(self.cache.get_many(['one', 'two', 'three']),
+                         {'one': 1, 'two': 2})
+        self.assertEqual(self.cache.incr('one'), 2)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('two'))
+
+    def test_entries_expire(self):
+        self.cache.set('short', 'lived', timeout=0.05)
+        self.cache.set('forever', 'young', timeout=None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'again'))
+        self.assertEqual(self.cache.get('forever'), 'young')
+
+    def test_expired_read_keeps_a_concurrent_set(self):
+        self.cache.set('key', 'old', timeout=0.05)
+        time.sleep(0.1)
+        transaction = self.cache._transaction
+
+        def set_first():
+            # Another process stores the key between the read and the
+            # removal of the expired entry.
+            self.make_cache().set('key', 'new')
+            return transaction()
+
+        self.cache._transaction = set_first
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.make_cache().get('key'), 'new')
+
+    def test_tests_run_on_a_cache_of_their_own(self):
+        location = settings.CACHES['default']['LOCATION']
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
+        self.assertNotEqual(location,
+                            os.path.join(settings.BASE_DIR, 'cache.sqlite3'))
+
+    def test_instances_share_entries(self):
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=4)
+        for i in range(4):
+            cache.set(f'key{i}', i)
+            time.sleep(0.01)
+        cache._db.execute(
+            "UPDATE cache SET accessed = accessed + 60 WHERE key LIKE '%key0'")
+        cache.set('key4', 4)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key4'), 4)
+
+    def test_size_limit(self):
+        cache = self.make_cache(MAX_SIZE=10 * 1024)
+        for i in range(20):
+            cache.set(f'blob{i}', b'x' * 1024)
+        entries, size = cache._db.execute(
+            'SELECT entries, size FROM cache_totals').fetchone()
+        self.assertLessEqual(size, 10 * 1024)
+        self.assertEqual(entries, len(cache.get_many(
+            [f'blob{i}' for i in range(20)])))
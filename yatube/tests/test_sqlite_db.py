@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.name = os.path.join(self.directory.name, 'db.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def connect(self, **options):
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'yatube.sqlite_db', 'NAME': self.name,
+            'OPTIONS': options,
+        }})
+        connection = handler['default']
+        self.addCleanup(connection.close)
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_set_on_connect(self):
+        connection = self.connect(pragmas={
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+            'busy_timeout': 1234,
+        })
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 1234)
+
+    def begin(self, transaction_mode):
+        connection = self.connect(timeout=0, transaction_mode=transaction_mode,
+                                  pragmas={'journal_mode': 'WAL'})
+        connection.ensure_connection()
+        connection._start_transaction_under_autocommit()
+        self.addCleanup(connection.connection.rollback)
+        return connection
+
+    def test_immediate_transactions_take_the_write_lock(self):
+        deferred = self.begin('deferred')
+        self.begin('immediate')
+        deferred.connection.rollback()
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.begin('immediate')
+
+    def test_write_blocks_take_the_write_lock(self):
+        writer = self.connect(timeout=0, pragmas={'journal_mode': 'WAL'})
+        writer.ensure_connection()
+        with writer.immediate():
+            writer._start_transaction_under_autocommit()
+        self.addCleanup(writer.connection.rollback)
+        # Deferred transactions still begin next to the writer.
+        self.begin('deferred')
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.begin('immediate')
+
+    def test_unknown_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.connect(transaction_mode='LAZY').connect()
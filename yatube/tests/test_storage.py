@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from yatube import storage
+from yatube.files import IMMUTABLE, serve_static
+
+STYLE = 'body { background: url("img/dot.png"); }\n' * 50
+
+
+class CompressedManifestStorageTest(SimpleTestCase):
+
+    def setUp(self):
+        self.source = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.source.name, 'css', 'img'))
+        with open(os.path.join(self.source.name, 'css', 'app.css'),
+                  'w') as file:
+            file.write(STYLE)
+        with open(os.path.join(self.source.name, 'css', 'img', 'dot.png'),
+                  'wb') as file:
+            file.write(b'\x89PNG' + bytes(512))
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source.name], STATIC_ROOT=self.root.name,
+            INSTALLED_APPS=['django.contrib.staticfiles'],
+            SENDFILE_MODE='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def tearDown(self):
+        self.source.cleanup()
+        self.root.cleanup()
+
+    def get(self, path, **headers):
+        response = serve_static(RequestFactory().get('/static/' + path,
+                                                     **headers), path)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_static_resolves_hashed_names_from_the_manifest(self):
+        with open(os.path.join(self.root.name, 'staticfiles.json')) as file:
+            manifest = json.load(file)['paths']
+        hashed = manifest['css/app.css']
+        self.assertRegex(hashed, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertEqual(static('css/app.css'), '/static/' + hashed)
+        with open(os.path.join(self.root.name, hashed)) as file:
+            self.assertIn(manifest['css/img/dot.png'][len('css/'):],
+                          file.read())
+
+    def test_text_assets_are_precompressed(self):
+        hashed = staticfiles_storage.stored_name('css/app.css')
+        path = os.path.join(self.root.name, hashed)
+        with open(path, 'rb') as plain, open(path + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), plain.read())
+        self.assertEqual(os.path.exists(path + '.br'),
+                         storage.brotli is not None)
+        image = staticfiles_storage.stored_name('css/img/dot.png')
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root.name, image + '.gz')))
+
+    def test_serving_picks_the_accepted_variant(self):
+        hashed = staticfiles_storage.stored_name('css/app.css')
+        with open(os.path.join(self.root.name, hashed), 'rb') as file:
+            plain = file.read()
+        response, content = self.get(hashed, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(gzip.decompress(content), plain)
+        response, content = self.get(
+            hashed, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(content, plain)
+
+    def test_unhashed_names_are_not_immutable(self):
+        response, _ = self.get('css/app.css')
+        self.assertNotIn('Cache-Control', response)
+
+    def test_uncollected_files_fall_back_to_their_name(self):
+        self.assertEqual(static('css/missing.css'),
+                         '/static/css/missing.css')
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+
+from yatube.threaded_asgi import ThreadedASGIHandler
+
+
+def echo(environ, start_response):
+    start_response('201 Created', [
+        ('Content-Type', 'text/plain'),
+        ('X-Thread', threading.current_thread().name),
+    ])
+    yield environ['PATH_INFO'].encode('latin-1')
+    yield b'?' + environ['QUERY_STRING'].encode()
+    yield b' ' + environ['wsgi.input'].read()
+    yield b' ' + environ['HTTP_X_TAG'].encode()
+
+
+class ThreadedASGIHandlerTest(SimpleTestCase):
+
+    def request(self, application, method='GET', path='/', body=b'',
+                query_string=b'', headers=()):
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': query_string, 'headers': list(headers),
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+        }
+        messages = [
+            {'type': 'http.request', 'body': body[:3], 'more_body': True},
+            {'type': 'http.request', 'body': body[3:]},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        start, *chunks = sent
+        return (start['status'], dict(start['headers']),
+                b''.join(chunk.get('body', b'') for chunk in chunks))
+
+    def test_request_is_handled_in_pool(self):
+        status, headers, body = self.request(
+            ThreadedASGIHandler(echo, 2), 'POST', '/путь/', b'request body',
+            b'a=1', [(b'x-tag', b'one'), (b'x-tag', b'two')])
+        self.assertEqual(status, 201)
+        self.assertTrue(headers[b'x-thread'].startswith(b'asgi'))
+        self.assertEqual(body.decode(),
+                         '/путь/?a=1 request body one,two')
+
+    def test_head_sends_no_body(self):
+        status, _, body = self.request(
+            ThreadedASGIHandler(echo, 1), 'HEAD',
+            headers=[(b'x-tag', b'one')])
+        self.assertEqual((status, body), (201, b''))
+
+    def test_serves_django(self):
+        application = ThreadedASGIHandler(get_wsgi_application(), 2)
+        status, headers, body = self.request(application,
+                                             path='/about/author/')
+        self.assertEqual(status, 200)
+        self.assertIn(b'text/html', headers[b'content-type'])
+        self.assertIn('</html>', body.decode())
+
+    def test_lifespan(self):
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(ThreadedASGIHandler(echo, 1)({'type': 'lifespan'},
+                                                  receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
@@ -0,0 +1,44 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+METRIC = re.compile(r'(\w+);(?:desc="([^"]*)";)?dur=([\d.]+)')
+
+
+class ServerTimingTest(TestCase):
+
+    def setUp(self):
+        # A page served from the cache renders no template.
+        cache.clear()
+
+    def metrics(self, response):
+        return {name: (description, float(duration))
+                for name, description, duration
+                in METRIC.findall(response['Server-Timing'])}
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING=True)
+    def test_header_and_log_line(self):
+        with self.assertLogs('yatube.timing', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('group_list'))
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'db', 'cache', 'tpl', 'total'})
+        self.assertEqual(metrics['db'][0], f'{len(queries)} queries')
+        hits, misses = map(int, re.findall(r'\d+', metrics['cache'][0]))
+        self.assertGreater(hits + misses, 0)
+        self.assertGreater(metrics['tpl'][1], 0)
+        self.assertGreaterEqual(metrics['total'][1], metrics['tpl'][1])
+
+        [line] = logs.output
+        self.assertIn('method=GET path=/group/ status=200 ', line)
+        self.assertIn(f'db_queries={len(queries)} ', line)
+        self.assertIn(f'cache_hits={hits} cache_misses={misses} ', line)
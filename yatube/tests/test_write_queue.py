@@ -0,0 +1,82 @@
+import threading
+from unittest import mock
+
+from django.http import Http404
+from django.test import TransactionTestCase, override_settings
+
+from posts import views
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post, User
+from yatube import write_queue
+
+
+def create_group(slug):
+    if slug == 'broken':
+        Group.objects.create(title=slug, slug='partial', description='')
+        raise ValueError(slug)
+    return Group.objects.create(title=slug, slug=slug, description='')
+
+
+@override_settings(WRITE_BATCH_SIZE=10, WRITE_BATCH_DELAY=0.5)
+class WriteQueueTest(TransactionTestCase):
+
+    def run_concurrently(self, slugs, func=create_group):
+        results = {}
+
+        def request(slug):
+            try:
+                results[slug] = write_queue.run(func, slug)
+            except Exception as error:
+                results[slug] = error
+
+        threads = [threading.Thread(target=request, args=(slug,))
+                   for slug in slugs]
+        with mock.patch.object(write_queue, '_commit',
+                               wraps=write_queue._commit) as commit:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return results, [len(call.args[0]) for call in commit.call_args_list]
+
+    def test_concurrent_writes_share_a_commit(self):
+        slugs = [f'group{number}' for number in range(5)]
+        results, batches = self.run_concurrently(slugs)
+        self.assertEqual(batches, [5])
+        self.assertEqual({slug: group.slug for slug, group in results.items()},
+                         {slug: slug for slug in slugs})
+        self.assertEqual(Group.objects.count(), 5)
+
+    def test_errors_are_reported_to_their_caller_only(self):
+        results, batches = self.run_concurrently(['first', 'broken', 'last'])
+        self.assertEqual(batches, [3])
+        self.assertIsInstance(results['broken'], ValueError)
+        self.assertEqual(results['last'].slug, 'last')
+        self.assertEqual(
+            sorted(Group.objects.values_list('slug', flat=True)),
+            ['first', 'last'])
+
+    def test_not_found_fails_only_its_own_write(self):
+        author = User.objects.create(username='author')
+        post = Post.objects.create(text='Commented.', author=author)
+
+        def comment(name):
+            form = CommentForm({'text': name})
+            form.is_valid()
+            post_id = post.id + 1 if name == 'missing' else post.id
+            return views._save_comment(form, author, 'author', post_id)
+
+        results, batches = self.run_concurrently(
+            ['first', 'missing', 'last'], comment)
+        self.assertEqual(batches, [3])
+        self.assertIsInstance(results['missing'], Http404)
+        self.assertEqual(
+            sorted(Comment.objects.values_list('text', flat=True)),
+            ['first', 'last'])
+
+    @override_settings(WRITE_BATCH_SIZE=0)
+    def test_disabled_queue_runs_in_place(self):
+        self.assertEqual(write_queue.run(create_group, 'here').slug, 'here')
+        with self.assertRaises(ValueError):
+            write_queue.run(create_group, 'broken')
+        self.assertFalse(Group.objects.filter(slug='partial').exists())
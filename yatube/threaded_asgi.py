@@ -0,0 +1,131 @@
+"""ASGI adapter running the Django application in a thread pool.
+
+Django 2.2 has no ASGI handler and no async views, so ``yatube/asgi.py``
+serves the regular WSGI application through this adapter. The event
+loop owns the connections: it receives the request body and sends the
+response to the client, so slow clients and idle keep-alive
+connections cost a coroutine, not a thread. Only the view itself, with
+its database and cache access, runs in one of ``threads`` worker
+threads, each keeping its own persistent database connection.
+
+Request bodies above ``FILE_UPLOAD_MAX_MEMORY_SIZE`` are spooled to a
+temporary file, as Django does with uploads.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+_DONE = object()
+
+
+def _environ(scope, body):
+    """Build the WSGI environ of an ASGI HTTP scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ThreadedASGIHandler:
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported scope type {scope["type"]}.')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await self.respond(_environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def respond(self, environ, send):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        chunks = await self.run(self.wsgi_application, environ,
+                                start_response)
+        try:
+            chunks_iterator = iter(chunks)
+            # Streaming bodies (files) are read in the pool too.
+            chunk = await self.run(next, chunks_iterator, _DONE)
+            # Generator applications only call start_response once the
+            # first chunk is asked for.
+            await send({'type': 'http.response.start', **started})
+            while chunk is not _DONE:
+                if chunk and environ['REQUEST_METHOD'] != 'HEAD':
+                    await send({'type': 'http.response.body', 'body': chunk,
+                                'more_body': True})
+                chunk = await self.run(next, chunks_iterator, _DONE)
+            await send({'type': 'http.response.body'})
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                # Fires request_finished, which releases old connections.
+                await self.run(close)
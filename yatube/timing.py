@@ -0,0 +1,137 @@
+"""Per-request SQL, cache and template timings.
+
+With ``SERVER_TIMING`` on, ``ServerTimingMiddleware`` measures for every
+request the SQL queries run by the request's thread, the keys found and
+missed in ``SQLiteCache``, the time spent rendering templates through
+``TimedDjangoTemplates`` and the total time of the response. They are
+sent in a ``Server-Timing`` header, which browsers show in the network
+panel, and logged to ``yatube.timing`` as one line of ``key=value``
+pairs:
+
+    Server-Timing: db;desc="12 queries";dur=3.1,
+        cache;desc="4 hits, 1 misses";dur=0.4, tpl;dur=5.2, total;dur=11.0
+
+Writes handed to ``yatube.write_queue`` run in the writer thread, so
+only the wait for them shows, in ``total``. With the setting off the
+middleware drops out of the chain and the hooks only read a
+thread-local.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+class Metrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache = 0.0
+        self.template = 0.0
+        self.rendering = False
+
+    def query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def header(self, total):
+        return ', '.join([
+            f'db;desc="{self.queries} queries";dur={self.db * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} '
+            f'misses";dur={self.cache * 1000:.1f}',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    def log_line(self, request, response, total):
+        return (
+            f'method={request.method} path={quote(request.path)} '
+            f'status={response.status_code} total_ms={total * 1000:.1f} '
+            f'db_queries={self.queries} db_ms={self.db * 1000:.1f} '
+            f'cache_hits={self.cache_hits} '
+            f'cache_misses={self.cache_misses} '
+            f'cache_ms={self.cache * 1000:.1f} '
+            f'template_ms={self.template * 1000:.1f}'
+        )
+
+
+def _current():
+    return getattr(_local, 'metrics', None)
+
+
+def cache_read(keys, found, started):
+    """Record a cache read started at ``started`` that found ``found`` of
+    ``keys`` keys.
+    """
+    metrics = _current()
+    if metrics is not None:
+        metrics.cache += time.perf_counter() - started
+        metrics.cache_hits += found
+        metrics.cache_misses += keys - found
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        metrics = _current()
+        # Templates rendered by a template tag belong to the outer one.
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template += time.perf_counter() - started
+            metrics.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template engine timing the templates it renders."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class ServerTimingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = Metrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = time.perf_counter() - started
+        response['Server-Timing'] = metrics.header(total)
+        logger.info(metrics.log_line(request, response, total))
+        return response
@@ -22,16 +22,17 @@ if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
 else:
-    from django.views.static import serve
     from django.urls import re_path
+    from yatube.files import serve, serve_static
 
     urlpatterns += [
         re_path(r'^media/(?P<path>.*)$',
                 serve,
-                {'document_root': settings.MEDIA_ROOT}),
+                {'document_root': settings.MEDIA_ROOT,
+                 'accel_prefix': '/internal/media/'}),
         re_path(r'^static/(?P<path>.*)$',
-                serve,
-                {'document_root': settings.STATIC_ROOT}),
+                serve_static,
+                {'accel_prefix': '/internal/static/'}),
     ]
 
 handler404 = 'posts.views.page_not_found' # noqa
@@ -0,0 +1,109 @@
+"""Group commit of small write transactions on SQLite.
+
+SQLite has one writer at a time, so concurrent requests that each commit
+a tiny transaction mostly wait for the lock. ``run`` hands the write to
+a writer thread of the process instead. The thread takes the first
+queued write, collects whatever else arrives within
+``WRITE_BATCH_DELAY`` seconds (at most ``WRITE_BATCH_SIZE`` writes) and
+runs them all in one transaction, each in a savepoint of its own. Every
+caller gets its own return value, or its own exception with only its
+changes rolled back; if the commit itself fails, every write of the
+batch fails with that error. ``on_commit`` callbacks run after the
+shared commit.
+
+Writes called inside an atomic block, e.g. in tests, and all writes with
+``WRITE_BATCH_SIZE = 0`` run in place in a transaction of their own.
+Write transactions begin with ``write_transaction``, so they queue for the
+SQLite write lock at BEGIN while read-only ones stay deferred.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_queue = None
+_queue_pid = None
+
+
+def _get_queue():
+    global _queue, _queue_pid
+    with _lock:
+        # A forked worker process gets a writer thread of its own.
+        if _queue_pid != os.getpid():
+            _queue = queue.SimpleQueue()
+            _queue_pid = os.getpid()
+            threading.Thread(target=_writer, args=(_queue,), daemon=True,
+                             name='write-queue').start()
+        return _queue
+
+
+@contextmanager
+def write_transaction():
+    """``atomic()`` taking the write lock at BEGIN on the SQLite backend."""
+    immediate = getattr(connection, 'immediate', nullcontext)
+    with immediate(), transaction.atomic():
+        yield
+
+
+def _collect(jobs):
+    batch = [jobs.get()]
+    deadline = time.monotonic() + settings.WRITE_BATCH_DELAY
+    while len(batch) < settings.WRITE_BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        try:
+            batch.append(jobs.get(timeout=timeout) if timeout > 0
+                         else jobs.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _commit(batch):
+    outcomes, committed = [], []
+    try:
+        with write_transaction():
+            transaction.on_commit(lambda: committed.append(True))
+            for future, func, args, kwargs in batch:
+                try:
+                    with transaction.atomic():
+                        outcomes.append((future, func(*args, **kwargs), None))
+                except Exception as error:
+                    outcomes.append((future, None, error))
+    except Exception as error:
+        if not committed:
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        logger.exception('on_commit callback of a write batch failed.')
+    for future, result, error in outcomes:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+def _writer(jobs):
+    while True:
+        batch = _collect(jobs)
+        try:
+            _commit(batch)
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+
+def run(func, *args, **kwargs):
+    """Run ``func`` in the next group commit and return its result."""
+    if not settings.WRITE_BATCH_SIZE or connection.in_atomic_block:
+        with write_transaction():
+            return func(*args, **kwargs)
+    future = Future()
+    _get_queue().put((future, func, args, kwargs))
+    return future.result()
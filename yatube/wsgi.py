@@ -5,3 +5,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Read the static files manifest now instead of on the first request.
+from django.contrib.staticfiles.storage import staticfiles_storage  # noqa
+staticfiles_storage.hashed_files